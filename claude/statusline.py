@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 """Custom status line for Claude Code.
 
+Each refresh is a thin client: it forwards the JSON on stdin to a warm daemon
+over a Unix socket and prints the reply. If the daemon isn't running it renders
+in-process and starts one, which exits after IDLE_TIMEOUT without requests or
+when this file changes. Set STATUSLINE_NO_DAEMON=1 to always render in-process.
+
 See: https://code.claude.com/docs/en/statusline
 """
 
-import json
-import subprocess
+# Only what the client needs; everything else is imported where it's used. _socket
+# rather than socket, whose enum/selectors imports would double the startup time.
+import _socket
+import _thread
+import os
 import sys
-from pathlib import Path
 
 # ANSI colors
 BLUE = "\033[34m"
@@ -17,6 +24,32 @@ RED = "\033[31m"
 DIM = "\033[2m"
 RESET = "\033[0m"
 
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "claude-statusline")
+# Per-user dir: under $XDG_RUNTIME_DIR on Linux or $TMPDIR on macOS (both private to the user), else the cache dir
+_runtime_base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR")
+RUNTIME_DIR = os.path.join(_runtime_base, "claude-statusline") if _runtime_base else CACHE_DIR
+SOCKET_PATH = os.path.join(RUNTIME_DIR, "daemon.sock")
+CLIENT_TIMEOUT = 0.2  # seconds to wait for the daemon before rendering in-process; twice its longest deadline
+IDLE_TIMEOUT = 600  # seconds without a request before the daemon exits
+GIT_CACHE_DIR = os.path.join(CACHE_DIR, "git")
+CONFIG_PATH = os.path.expanduser("~/.claude/statusline.json")  # {"segments": [...], "deadline_ms": ...}
+DEFAULT_LAYOUT = ["dir", "git_branch", "git_status", "|", "model", "|", "context", "|", "tokens", "cost", "|", "burn"]
+DEADLINE_MS = 100  # the whole line renders within this, whatever git or the disk are doing
+LATE_WAIT = 0.5  # seconds an in-process render lingers, after printing, for late segments to save their output
+
+# Per-session sample history: a fixed-size binary ring buffer, so recording a sample is two pwrites
+SESSIONS_DIR = os.path.join(CACHE_DIR, "sessions")
+RING_MAGIC = b"CSR1"
+RING_HEADER = "<4sIQ"  # magic, capacity, samples ever written
+RING_RECORD = "<dQQQd"  # unix time, context tokens, total input tokens, total output tokens, cost USD
+RING_CAPACITY = 256
+BURN_WINDOW = 600  # seconds of history rates are measured over
+SESSION_MAX_AGE = 7 * 86400  # ring files untouched this long are deleted
+GIT_STATUS_TTL = 30  # seconds; worktree edits don't touch index/HEAD, so re-check this often anyway
+
+_in_daemon = False
+_late_threads = []  # segment threads still running when run_segments returned
+
 
 def format_tokens(n):
     """Format token count: 1234 -> 1.2k, 12345 -> 12k"""
@@ -29,29 +62,250 @@ def format_tokens(n):
 
 def dir_path(workspace):
     """Short directory path (last 2 parts)."""
-    cwd = workspace.get("current_dir") or str(Path.cwd())
-    cwd = cwd.replace(str(Path.home()), "~")
-    parts = Path(cwd).parts
+    cwd = workspace.get("current_dir") or os.getcwd()
+    cwd = cwd.replace(os.path.expanduser("~"), "~")
+    parts = cwd.rstrip("/").split("/")
     short = "/".join(parts[-2:]) if len(parts) > 2 else cwd
     return f"{BLUE}{short}{RESET}"
 
 
-def git_branch():
-    """Git branch via subprocess (handles subdirs, detached HEAD, packed refs)."""
+_git_dirs = {}  # start dir -> git dir; only lives across renders in the daemon
+
+
+def find_git_dir(start):
+    """Walk up from start to the repo's git dir, following `gitdir:` files (worktrees, submodules).
+
+    Returns None outside a repo, or False for a .git we can't make sense of.
+    """
+    cached = _git_dirs.get(start)
+    if cached and os.path.isfile(os.path.join(cached, "HEAD")):
+        return cached
+    d = start
+    while True:
+        dot_git = os.path.join(d, ".git")
+        if os.path.isdir(dot_git):
+            git_dir = dot_git
+            break
+        if os.path.isfile(dot_git):
+            with open(dot_git) as f:
+                content = f.read().strip()
+            if not content.startswith("gitdir:"):
+                return False
+            git_dir = os.path.join(d, content[len("gitdir:"):].strip())  # absolute paths replace d
+            break
+        parent = os.path.dirname(d)
+        if parent == d:
+            return None
+        d = parent
+    _git_dirs[start] = git_dir
+    return git_dir
+
+
+def read_branch(start):
+    """Branch name from HEAD without running git: "" when detached or not in a repo, None if git has to decide."""
+    if any(var in os.environ for var in ("GIT_DIR", "GIT_WORK_TREE", "GIT_CEILING_DIRECTORIES")):
+        return None
     try:
-        result = subprocess.run(
-            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-            capture_output=True, text=True, timeout=0.5,
-        )
-        if result.returncode == 0:
-            branch = result.stdout.strip()
-            if branch and branch != "HEAD":  # HEAD means detached
-                return f" {GREEN}\ue725 {branch}{RESET}"
-    except Exception:
-        pass
+        git_dir = find_git_dir(start)
+        if git_dir is None:
+            return ""
+        if git_dir is False:
+            return None
+        with open(os.path.join(git_dir, "HEAD")) as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+    if head.startswith("ref: refs/heads/"):
+        branch = head[len("ref: refs/heads/"):]
+        return None if branch == ".invalid" else branch  # .invalid: reftable repo
+    if len(head) in (40, 64) and all(c in "0123456789abcdef" for c in head):
+        return ""  # detached
+    return None
+
+
+def git_branch(workspace):
+    """Git branch, read straight from .git/HEAD; git itself is only run for layouts read_branch can't handle."""
+    start = os.path.abspath(workspace.get("current_dir") or os.getcwd())
+    branch = read_branch(start)
+    if branch is None:
+        try:
+            import subprocess
+
+            result = subprocess.run(
+                ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+                cwd=start, capture_output=True, text=True, timeout=0.5,
+            )
+            branch = result.stdout.strip() if result.returncode == 0 else ""
+        except Exception:
+            branch = ""
+    if branch and branch != "HEAD":  # HEAD means detached
+        return f" {GREEN}\ue725 {branch}{RESET}"
     return ""
 
 
+def git_status_key(git_dir):
+    """mtimes of the index, HEAD and the checked-out ref: if none moved, neither did the status (mostly)."""
+    common = git_dir
+    try:
+        with open(os.path.join(git_dir, "commondir")) as f:  # worktrees keep refs in the main git dir
+            common = os.path.join(git_dir, f.read().strip())
+    except OSError:
+        pass
+    paths = [os.path.join(git_dir, "index"), os.path.join(git_dir, "HEAD")]
+    try:
+        with open(paths[1]) as f:
+            head = f.read().strip()
+        if head.startswith("ref: "):
+            ref = os.path.join(common, head[5:])
+            paths.append(ref if os.path.exists(ref) else os.path.join(common, "packed-refs"))
+    except OSError:
+        pass
+    key = []
+    for path in paths:
+        try:
+            key.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            key.append(0)
+    return key
+
+
+def git_status_cache_path(git_dir):
+    return os.path.join(GIT_CACHE_DIR, os.path.abspath(git_dir).strip("/").replace("/", "%") + ".json")
+
+
+def parse_git_status(output):
+    """Counts from `git status --porcelain=v2 --branch --show-stash` output."""
+    counts = {"ahead": 0, "behind": 0, "staged": 0, "modified": 0, "conflicted": 0, "untracked": 0, "stash": 0}
+    for line in output.splitlines():
+        if line.startswith("# branch.ab "):
+            ahead, behind = line.split()[2:4]
+            counts["ahead"], counts["behind"] = int(ahead), -int(behind)
+        elif line.startswith("# stash "):
+            counts["stash"] = int(line.split()[2])
+        elif line.startswith(("1 ", "2 ")):
+            xy = line[2:4]
+            counts["staged"] += xy[0] != "."
+            counts["modified"] += xy[1] != "."
+        elif line.startswith("u "):
+            counts["conflicted"] += 1
+        elif line.startswith("? "):
+            counts["untracked"] += 1
+    return counts
+
+
+def open_lock(path):
+    """Open (creating) a lock file as a raw fd, refusing to follow a symlink planted in its place."""
+    return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+
+
+def private_dir(path):
+    """Create path as a 0700 dir, or check an existing one is ours (tightening it to 0700). Raises OSError if not."""
+    import stat
+
+    try:
+        os.makedirs(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory of ours")
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)  # e.g. the cache dir, made with the default umask
+
+
+def refresh_git_status(start, git_dir):
+    """Run git status in start and cache the counts for git_dir. Skips if another refresh holds the lock."""
+    import fcntl
+    import json
+    import subprocess
+    import time
+
+    os.makedirs(GIT_CACHE_DIR, exist_ok=True)
+    path = git_status_cache_path(git_dir)
+    try:
+        lock = open_lock(path + ".lock")
+    except OSError:
+        return
+    try:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        try:
+            result = subprocess.run(
+                ["git", "--no-optional-locks", "status", "--porcelain=v2", "--branch", "--show-stash"],
+                cwd=start, capture_output=True, text=True, timeout=30,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return
+        if result.returncode != 0:
+            return
+        entry = {"key": git_status_key(git_dir), "at": time.time(), "counts": parse_git_status(result.stdout)}
+        with open(path + ".tmp", "w") as f:
+            json.dump(entry, f)
+        os.replace(path + ".tmp", path)
+    finally:
+        os.close(lock)
+
+
+def refresh_git_status_in_background(start, git_dir):
+    """In the daemon, a thread; otherwise a detached `statusline.py --git-status` so this render doesn't wait."""
+    if _in_daemon:
+        import threading
+
+        threading.Thread(target=refresh_git_status, args=(start, git_dir), daemon=True).start()
+        return
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--git-status", start],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def git_status(workspace):
+    """Ahead/behind, staged, modified, conflicted, untracked and stash counts, e.g. " ⇡1 +2 !3 ?1".
+
+    Served from the on-disk cache (possibly stale) and refreshed in the background
+    when the index, HEAD or current ref changed or it's older than GIT_STATUS_TTL.
+    """
+    import json
+    import time
+
+    start = os.path.abspath(workspace.get("current_dir") or os.getcwd())
+    if not read_branch(start):  # not a repo, detached, or a layout we leave to git
+        return ""
+    git_dir = find_git_dir(start)
+    try:
+        with open(git_status_cache_path(git_dir)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        entry = None
+    if not entry or entry["key"] != git_status_key(git_dir) or time.time() - entry["at"] > GIT_STATUS_TTL:
+        try:
+            refresh_git_status_in_background(start, git_dir)
+        except OSError:
+            pass
+    if not entry:
+        return ""
+
+    counts = entry["counts"]
+    parts = []
+    for name, symbol, color in (
+        ("ahead", "⇡", GREEN),
+        ("behind", "⇣", RED),
+        ("conflicted", "=", RED),
+        ("staged", "+", GREEN),
+        ("modified", "!", YELLOW),
+        ("untracked", "?", DIM),
+        ("stash", "*", DIM),
+    ):
+        if counts.get(name):
+            parts.append(f"{color}{symbol}{counts[name]}{RESET}")
+    return " " + " ".join(parts) if parts else ""
+
+
 def model_name(model):
     """Model display name."""
     if not model:
@@ -61,16 +315,22 @@ def model_name(model):
     return str(model)
 
 
+def _context_tokens(ctx):
+    """Tokens currently in the context window."""
+    current = ctx.get("current_usage")
+    if not current:
+        return 0
+    return (current.get("input_tokens", 0) +
+            current.get("cache_creation_input_tokens", 0) +
+            current.get("cache_read_input_tokens", 0))
+
+
 def _context_pct(ctx):
     """Calculate context usage percentage."""
-    current = ctx.get("current_usage")
     size = ctx.get("context_window_size", 0)
-    if not current or not size:
+    if not size:
         return 0
-    tokens = (current.get("input_tokens", 0) +
-              current.get("cache_creation_input_tokens", 0) +
-              current.get("cache_read_input_tokens", 0))
-    return int(tokens * 100 / size)
+    return int(_context_tokens(ctx) * 100 / size)
 
 
 def _heat_color(pct):
@@ -131,20 +391,283 @@ def cost(cost_data):
     return f" {DIM}${total:.1f}{RESET}"
 
 
-def render(data):
-    """Render status line from data dict."""
-    ws = data.get("workspace", {})
-    ctx = data.get("context_window", {})
+def record_sample(path, sample):
+    """Append a RING_RECORD sample to the ring file at path, unless it repeats the newest one."""
+    import struct
+
+    header_size, record_size = struct.calcsize(RING_HEADER), struct.calcsize(RING_RECORD)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        header = os.pread(fd, header_size, 0)
+        capacity, count = RING_CAPACITY, 0
+        if len(header) == header_size:
+            magic, capacity, count = struct.unpack(RING_HEADER, header)
+            if magic != RING_MAGIC or not capacity:
+                capacity, count = RING_CAPACITY, 0
+        if count:
+            newest = os.pread(fd, record_size, header_size + (count - 1) % capacity * record_size)
+            if struct.unpack(RING_RECORD, newest)[1:] == tuple(sample[1:]):
+                return
+        os.pwrite(fd, struct.pack(RING_RECORD, *sample), header_size + count % capacity * record_size)
+        os.pwrite(fd, struct.pack(RING_HEADER, RING_MAGIC, capacity, count + 1), 0)
+    finally:
+        os.close(fd)
+
+
+def read_samples(path):
+    """The samples in the ring file at path, oldest first."""
+    import struct
+
+    header_size, record_size = struct.calcsize(RING_HEADER), struct.calcsize(RING_RECORD)
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, capacity, count = struct.unpack_from(RING_HEADER, data)
+    if magic != RING_MAGIC:
+        return []
+    return [
+        struct.unpack_from(RING_RECORD, data, header_size + i % capacity * record_size)
+        for i in range(max(0, count - capacity), count)
+    ]
+
+
+def prune_sessions():
+    import time
+
+    for entry in os.scandir(SESSIONS_DIR):
+        try:
+            if time.time() - entry.stat().st_mtime > SESSION_MAX_AGE:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+def _format_minutes(minutes):
+    return f"{minutes:.0f}m" if minutes < 120 else f"{minutes / 60:.0f}h"
+
+
+def burn_rate(data):
+    """Tokens/min and $/hour over the last BURN_WINDOW, and turns/time until the context window is full.
 
-    return (
-        f"{dir_path(ws)}{git_branch()} {DIM}│{RESET} "
-        f"{model_name(data.get('model'))} {DIM}│{RESET} "
-        f"{context_bar(ctx)} {DIM}│{RESET} {session_tokens(ctx)}{cost(data.get('cost'))}"
+    Records this refresh's numbers in the session's ring buffer first. Only samples
+    since the last compaction (when context tokens dropped) count.
+    """
+    import time
+
+    session = "".join(c for c in data.get("session_id", "") if c.isalnum() or c in "-_")
+    if not session:
+        return ""
+    ctx = data.get("context_window", {})
+    now = time.time()
+    sample = (
+        now,
+        _context_tokens(ctx),
+        ctx.get("total_input_tokens", 0),
+        ctx.get("total_output_tokens", 0),
+        float((data.get("cost") or {}).get("total_cost_usd", 0)),
     )
+    path = os.path.join(SESSIONS_DIR, f"{session}.ring")
+    if not os.path.exists(path):
+        os.makedirs(SESSIONS_DIR, exist_ok=True)
+        prune_sessions()
+    record_sample(path, sample)
+
+    recent = []
+    for s in read_samples(path):
+        if recent and s[1] < recent[-1][1]:
+            recent = []  # compacted
+        recent.append(s)
+    recent = [s for s in recent if s[0] >= now - BURN_WINDOW]
+    if len(recent) < 2 or recent[-1][0] - recent[0][0] < 30:
+        return ""
+
+    first, last = recent[0], recent[-1]
+    minutes = (last[0] - first[0]) / 60
+    parts = [f"{format_tokens(int(((last[2] + last[3]) - (first[2] + first[3])) / minutes))}/min"]
+    usd_per_hour = (last[4] - first[4]) / minutes * 60
+    if usd_per_hour >= 0.01:
+        parts.append(f"${usd_per_hour:.2f}/h")
+    growth = last[1] - first[1]
+    left = ctx.get("context_window_size", 0) - last[1]
+    turns = sum(b[1] > a[1] for a, b in zip(recent, recent[1:]))
+    if growth > 0 and left > 0:
+        parts.append(f"full in ~{int(left / (growth / turns))} turns/{_format_minutes(left / (growth / minutes))}")
+    pct = _context_pct(ctx)
+    return f"{_heat_color(pct)}{' '.join(parts)}{RESET}"
+
+
+# name -> (render function taking the stdin data, time budget in seconds or None to run inline).
+# Budgeted segments touch the filesystem or run git, so they run in threads.
+SEGMENTS = {
+    "dir": (lambda data: dir_path(data.get("workspace", {})), None),
+    "git_branch": (lambda data: git_branch(data.get("workspace", {})), 0.05),
+    "git_status": (lambda data: git_status(data.get("workspace", {})), 0.05),
+    "model": (lambda data: model_name(data.get("model")), None),
+    "context": (lambda data: context_bar(data.get("context_window", {})), None),
+    "context_pct": (lambda data: context_usage(data.get("context_window", {})), None),
+    "tokens": (lambda data: session_tokens(data.get("context_window", {})), None),
+    "cost": (lambda data: cost(data.get("cost")), None),
+    "burn": (burn_rate, 0.05),
+}
+
+_config = (None, {})  # (mtime, parsed) of CONFIG_PATH
+_last_outputs = None  # "segment\tcwd" -> last output, for segments that miss the deadline
+MAX_LAST_OUTPUTS = 500
+_last_lock = _thread.allocate_lock()  # segment threads finish and save after render has returned
+# Segments whose output changes nearly every render fall back per session, in memory only
+SESSION_SEGMENTS = {"burn"}
+_session_outputs = {}  # "segment\tsession_id" -> last output, never saved
+_save_outputs = True  # off under --test, so sample data never reaches segments.json
+
+
+def load_config():
+    """CONFIG_PATH, re-read only when it changes. "segments" lists segment names in order, "|" for a separator."""
+    global _config
+    try:
+        mtime = os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError:
+        return {}
+    if _config[0] != mtime:
+        import json
+
+        try:
+            with open(CONFIG_PATH) as f:
+                _config = (mtime, json.load(f))
+        except (OSError, ValueError):
+            _config = (mtime, {})
+    return _config[1]
+
+
+def last_outputs():
+    global _last_outputs
+    if _last_outputs is None:
+        import json
+
+        try:
+            with open(os.path.join(CACHE_DIR, "segments.json")) as f:
+                _last_outputs = json.load(f)
+        except (OSError, ValueError):
+            _last_outputs = {}
+    return _last_outputs
+
+
+def save_last_outputs():
+    import json
+
+    if not _save_outputs:
+        return
+    with _last_lock:
+        while len(_last_outputs) > MAX_LAST_OUTPUTS:
+            del _last_outputs[next(iter(_last_outputs))]  # oldest first
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "segments.json")
+            with open(f"{path}.{os.getpid()}.tmp", "w") as f:
+                json.dump(_last_outputs, f)
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+        except OSError:
+            pass
+
+
+def run_segments(names, data, deadline):
+    """
+    Render each named segment. Inline ones run as is; budgeted ones run in
+    parallel threads and get until their budget or the deadline (seconds from
+    now), whichever is sooner. A segment that misses it, or fails, shows its
+    last output for this directory (or session, for SESSION_SEGMENTS) instead;
+    one that finishes late still records its output, so the next render shows it.
+    """
+    import threading
+    import time
+
+    start = time.monotonic()
+    cwd = data.get("workspace", {}).get("current_dir") or os.getcwd()
+    session = data.get("session_id", "")
+    last = last_outputs()
+    outputs = {}
+    threads = []
+    state = {"returned": False, "changed": False}
+
+    def fallback(name):
+        """The (store, key) a segment's last output lives under."""
+        if name in SESSION_SEGMENTS:
+            return _session_outputs, f"{name}\t{session}"
+        return last, f"{name}\t{cwd}"
+
+    def remember(name, output):
+        """Store a segment's output as its newest last output; True if segments.json needs saving."""
+        store, key = fallback(name)
+        if store.get(key) == output:
+            return False
+        store.pop(key, None)  # re-insert as newest
+        store[key] = output
+        if store is _session_outputs:
+            while len(store) > MAX_LAST_OUTPUTS:
+                del store[next(iter(store))]
+            return False
+        return True
+
+    def run(name, fn):
+        try:
+            output = fn(data)
+        except Exception:
+            return
+        with _last_lock:
+            outputs[name] = output
+            changed = remember(name, output)
+            late = state["returned"]
+            state["changed"] |= changed
+        if changed and late:
+            save_last_outputs()
+
+    for name in names:
+        fn, budget = SEGMENTS[name]
+        if budget is None:
+            try:
+                outputs[name] = fn(data)
+            except Exception:
+                outputs[name] = ""
+        else:
+            thread = threading.Thread(target=run, args=(name, fn), daemon=True)
+            thread.start()
+            threads.append((thread, min(budget, deadline)))
+
+    for thread, budget in threads:
+        thread.join(max(0, start + budget - time.monotonic()))
+    if not _in_daemon:  # the daemon outlives them anyway
+        _late_threads.extend(thread for thread, _ in threads if thread.is_alive())
+    with _last_lock:
+        state["returned"] = True
+        rendered = {}
+        for name in names:
+            store, key = fallback(name)
+            rendered[name] = outputs[name] if name in outputs else store.get(key, "")
+    if state["changed"]:
+        save_last_outputs()
+    return rendered
+
+
+def render(data):
+    """Render status line from data dict, with the segments and order from load_config()."""
+    config = load_config()
+    layout = config.get("segments") or DEFAULT_LAYOUT
+    deadline = config.get("deadline_ms", DEADLINE_MS) / 1000
+    if _in_daemon:
+        deadline = min(deadline, CLIENT_TIMEOUT / 2)  # reply before the client gives up and renders it again
+    outputs = run_segments([name for name in layout if name in SEGMENTS], data, deadline)
+
+    groups = [""]
+    for name in layout:
+        if name == "|":
+            groups.append("")
+        elif name in outputs:
+            groups[-1] += outputs[name]
+    return f" {DIM}│{RESET} ".join(group for group in groups if group)
 
 
 def test():
     """Test status line at different context levels."""
+    global _last_outputs, _save_outputs
+    _last_outputs, _save_outputs = {}, False  # don't mix sample paths into the real fallback cache
     samples = [
         ("Low (20%)", 40_000, 50_000, 10_000, 0.15),
         ("Medium (55%)", 110_000, 200_000, 40_000, 0.85),
@@ -165,17 +688,128 @@ def test():
         print(f"{label:12} {render(data)}")
 
 
+def render_payload(payload):
+    """Render raw stdin bytes, falling back to just the cwd if they can't be parsed or rendered."""
+    import json
+
+    try:
+        return render(json.loads(payload))
+    except Exception:
+        fallback = os.getcwd().replace(os.path.expanduser("~"), "~")
+        return f"{BLUE}{fallback}{RESET}"
+
+
+def ask_daemon(payload):
+    """Send payload to the daemon and return its rendered line. Raises OSError if it's down, slow or not ours."""
+    if os.lstat(SOCKET_PATH).st_uid != os.getuid():
+        raise PermissionError(f"{SOCKET_PATH} is owned by another user")
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CLIENT_TIMEOUT)
+        sock.connect(SOCKET_PATH)
+        sock.sendall(payload)
+        sock.shutdown(_socket.SHUT_WR)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    if not chunks:
+        raise ConnectionResetError("empty reply")
+    return b"".join(chunks).decode()
+
+
+def spawn_daemon():
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--daemon"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def serve():
+    """Render requests on SOCKET_PATH until IDLE_TIMEOUT passes without one or this file changes."""
+    global _in_daemon
+    import fcntl
+    import socketserver
+
+    try:
+        private_dir(RUNTIME_DIR)
+        lock = open_lock(SOCKET_PATH + ".lock")
+    except OSError:
+        return  # someone else's directory or lock; clients keep rendering in-process
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return  # another daemon already owns the socket
+    try:
+        os.unlink(SOCKET_PATH)  # stale, from a daemon that died
+    except FileNotFoundError:
+        pass
+    started = os.stat(__file__).st_mtime
+    _in_daemon = True
+
+    class Handler(socketserver.StreamRequestHandler):
+        timeout = 1
+
+        def handle(self):
+            self.server.served = True
+            self.wfile.write(render_payload(self.rfile.read()).encode())
+
+    old_umask = os.umask(0o177)  # socket only usable by this user
+    try:
+        server = socketserver.UnixStreamServer(SOCKET_PATH, Handler)
+    finally:
+        os.umask(old_umask)
+    server.timeout = IDLE_TIMEOUT
+    try:
+        while True:
+            server.served = False
+            server.handle_request()
+            if not server.served or os.stat(__file__).st_mtime != started:
+                break
+    finally:
+        os.unlink(SOCKET_PATH)
+        server.server_close()
+
+
 def main():
     if len(sys.argv) > 1 and sys.argv[1] == "--test":
         test()
         return
+    if len(sys.argv) > 1 and sys.argv[1] == "--daemon":
+        serve()
+        return
+    if len(sys.argv) > 2 and sys.argv[1] == "--git-status":
+        start = os.path.abspath(sys.argv[2])
+        git_dir = read_branch(start) and find_git_dir(start)
+        if git_dir:
+            refresh_git_status(start, git_dir)
+            print(git_status({"current_dir": start}))
+        return
 
-    try:
-        data = json.load(sys.stdin)
-        print(render(data), flush=True)
-    except Exception:
-        fallback = str(Path.cwd()).replace(str(Path.home()), "~")
-        print(f"{BLUE}{fallback}{RESET}", flush=True)
+    payload = sys.stdin.buffer.read()
+    line = None
+    if not os.environ.get("STATUSLINE_NO_DAEMON"):
+        try:
+            line = ask_daemon(payload)
+        except (FileNotFoundError, ConnectionRefusedError):
+            spawn_daemon()  # not running; render this one ourselves
+        except OSError:
+            pass  # running but slow; don't start a second one
+    if line is None:
+        line = render_payload(payload)
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+    if _late_threads:
+        import time
+
+        # Daemon threads die with this process; give them a moment so the next render has their output
+        until = time.monotonic() + LATE_WAIT
+        for thread in _late_threads:
+            thread.join(max(0, until - time.monotonic()))
 
 
 if __name__ == "__main__":
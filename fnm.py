@@ -10,12 +10,38 @@ Usage:
     uv run fnm.py upgrade       # Upgrade and reinstall global packages
     uv run fnm.py status        # Show current state
     uv run fnm.py cleanup       # Remove old versions
+    uv run fnm.py restore       # Reinstall the exact global packages saved before the last upgrade
+    uv run fnm.py scan ~/code   # Install versions required by .nvmrc / .node-version / engines.node
+
+Remote lookups (Node release index, latest fnm release) are cached under
+$XDG_CACHE_HOME/fnm-py and revalidated with ETags once the TTL expires:
+    uv run fnm.py --offline status      # Never touch the network
+    uv run fnm.py --refresh status      # Revalidate now, ignoring the TTL
+
+Scripting and profiling:
+    uv run fnm.py status --json         # Result as JSON on stdout (also install/upgrade/cleanup)
+    uv run fnm.py --timings status      # Wall time of every subprocess / request on stderr
+    uv run fnm.py --trace t.json status # Same, as a Chrome trace-event file
 """
 
+import asyncio
+import contextlib
+import os
+import re
 import subprocess
 import shutil
 import json
-from typing import Annotated
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from functools import cache, cached_property
+from pathlib import Path
+from typing import Annotated, Any, Callable, Sequence
 
 import typer
 
@@ -26,16 +52,190 @@ app = typer.Typer(
 )
 
 
-def run(cmd: str, capture: bool = True, check: bool = True) -> str:
-    """Run a shell command and return stdout."""
-    result = subprocess.run(
-        cmd,
-        shell=True,
-        capture_output=capture,
-        text=True,
-        check=check,
-    )
-    return result.stdout.strip() if capture else ""
+PROBE_TIMEOUT = 60  # seconds; read-only queries. Installs run without a timeout.
+STARTED = time.perf_counter()
+
+
+@dataclass
+class Timing:
+    """One timed subprocess or HTTP request; start is seconds since the script started."""
+
+    name: str
+    kind: str
+    start: float
+    duration: float
+    ok: bool = True
+
+
+@dataclass
+class OutputSettings:
+    """Set from --timings/--trace and a command's --json."""
+
+    timings: bool = False
+    trace: Path | None = None
+    json_result: dict | None = None  # the running --json command's result, printed on exit
+
+
+output_settings = OutputSettings()
+timings: list[Timing] = []
+
+
+@contextlib.contextmanager
+def timed(name: str, kind: str):
+    """Record the wall time of the block in `timings` (kind groups it in the breakdown)."""
+    timing = Timing(name, kind, time.perf_counter() - STARTED, 0.0)
+    try:
+        yield timing
+    except BaseException:
+        timing.ok = False
+        raise
+    finally:
+        timing.duration = time.perf_counter() - STARTED - timing.start
+        timings.append(timing)
+
+
+async def arun(
+    args: list[str],
+    capture: bool = True,
+    check: bool = True,
+    timeout: float | None = None,
+    prefix: str | None = None,
+) -> str:
+    """
+    Run a command (argv list, no shell) and return its stripped stdout.
+    Raises CalledProcessError on non-zero exit if check, and TimeoutExpired
+    (after killing the process) if it outlives timeout.
+    With prefix, stdout+stderr are echoed line by line behind it instead
+    (for concurrent commands whose output would otherwise interleave).
+    Every call is recorded in `timings`.
+    """
+    if prefix is not None:
+        stdout, stderr = asyncio.subprocess.PIPE, asyncio.subprocess.STDOUT
+    elif capture:
+        stdout = stderr = asyncio.subprocess.PIPE
+    else:
+        # Under --json, stdout is reserved for the result
+        stdout, stderr = (sys.stderr if output_settings.json_result is not None else None), None
+    with timed(" ".join(args), " ".join(args[:2])) as timing:
+        try:
+            proc = await asyncio.create_subprocess_exec(*args, stdout=stdout, stderr=stderr)
+        except FileNotFoundError:
+            # Same as the shell's "command not found", so callers only handle one error
+            raise subprocess.CalledProcessError(127, args)
+        try:
+            if prefix is not None:
+                out, err = await asyncio.wait_for(_echo_prefixed(proc, prefix), timeout)
+            else:
+                out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(args, timeout)
+        timing.ok = proc.returncode == 0
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, args, out, err)
+    return out.decode().strip() if out is not None else ""
+
+
+async def _echo_prefixed(proc: asyncio.subprocess.Process, prefix: str) -> tuple[None, None]:
+    async for line in proc.stdout:
+        typer.echo(f"{prefix}{line.decode(errors='replace').rstrip()}")
+    await proc.wait()
+    return None, None
+
+
+def run(args: list[str], capture: bool = True, check: bool = True, timeout: float | None = None) -> str:
+    """Blocking arun()."""
+    return asyncio.run(arun(args, capture, check, timeout))
+
+
+def gather(*probes: Callable[[], Any]) -> list[Any]:
+    """Call independent blocking probes concurrently; results in argument order.
+
+    Total latency is that of the slowest probe. Snapshot probes (local_state,
+    remote_index) are memoized, so later plain calls reuse what was fetched here.
+    Plain threads, not an event loop: probes are blocking calls, and those that
+    run() a subprocess start their own loop.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(probes))) as pool:
+        futures = [pool.submit(probe) for probe in probes]
+    return [future.result() for future in futures]
+
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "fnm-py"
+NODE_DIST_MIRROR = os.environ.get("FNM_NODE_DIST_MIRROR", "https://nodejs.org/dist").rstrip("/")
+FNM_RELEASE_URL = "https://api.github.com/repos/Schniz/fnm/releases/latest"
+STATE_DIR = Path(os.environ.get("XDG_STATE_HOME") or Path.home() / ".local" / "state") / "fnm-py"
+MANIFEST_PATH = STATE_DIR / "global-packages.json"
+
+
+@dataclass
+class CacheSettings:
+    """Set once from the global CLI options."""
+
+    ttl: int = 3600
+    offline: bool = False
+    refresh: bool = False
+
+
+cache_settings = CacheSettings()
+
+
+def cached_fetch(name: str, url: str, parse: Callable[[bytes], Any]) -> Any | None:
+    """Fetch url through the on-disk cache and return parse(body), or None if unavailable.
+
+    Fresh entries (younger than the TTL) are served without a request. Stale ones are
+    revalidated with If-None-Match / If-Modified-Since, so an unchanged resource costs
+    a 304 and doesn't count against GitHub's rate limit. On network errors the stale
+    entry is served rather than nothing.
+    """
+    path = CACHE_DIR / f"{name}.json"
+    try:
+        entry = json.loads(path.read_text())
+        if entry.get("url") != url:
+            entry = None
+    except (OSError, json.JSONDecodeError):
+        entry = None
+
+    if entry and (cache_settings.offline or (
+        not cache_settings.refresh and time.time() - entry["fetched_at"] < cache_settings.ttl
+    )):
+        return entry["data"]
+    if cache_settings.offline:
+        return None
+
+    headers = {"User-Agent": "fnm.py", "Accept-Encoding": "identity"}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        with (
+            timed(f"GET {url}", f"GET {urllib.parse.urlsplit(url).netloc}"),
+            urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=10) as resp,
+        ):
+            entry = {
+                "url": url,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "data": parse(resp.read()),
+            }
+    except urllib.error.HTTPError as e:
+        if e.code != 304 or not entry:
+            return entry["data"] if entry else None
+    except (urllib.error.URLError, TimeoutError, ValueError):
+        return entry["data"] if entry else None
+
+    entry["fetched_at"] = time.time()
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry))
+        tmp.replace(path)
+    except OSError:
+        pass
+    return entry["data"]
 
 
 def get_fnm_path() -> str | None:
@@ -54,26 +254,21 @@ def is_fnm_from_homebrew() -> bool:
 def get_fnm_version() -> str | None:
     """Get installed fnm version."""
     try:
-        output = run("fnm --version")
+        output = run(["fnm", "--version"], timeout=PROBE_TIMEOUT)
         # Format: "fnm 1.38.1"
         parts = output.split()
         if len(parts) >= 2:
             return parts[1]
-    except subprocess.CalledProcessError:
+    except subprocess.SubprocessError:
         pass
     return None
 
 
 def get_latest_fnm_version() -> str | None:
-    """Get latest fnm version from GitHub."""
-    try:
-        output = run("curl -s https://api.github.com/repos/Schniz/fnm/releases/latest")
-        data = json.loads(output)
-        tag = data.get("tag_name", "")
-        # Format: "v1.38.1" -> "1.38.1"
-        return tag.lstrip("v") if tag else None
-    except (subprocess.CalledProcessError, json.JSONDecodeError):
-        return None
+    """Get latest fnm version from GitHub (cached, see cached_fetch)."""
+    # Format: "v1.38.1" -> "1.38.1"
+    tag = cached_fetch("fnm-release", FNM_RELEASE_URL, lambda body: json.loads(body).get("tag_name", ""))
+    return tag.lstrip("v") if tag else None
 
 
 def parse_version(version: str) -> tuple[int, ...]:
@@ -93,13 +288,13 @@ def install_fnm(upgrade: bool = False, use_brew: bool | None = None) -> None:
     if use_brew:
         if upgrade:
             typer.echo("Upgrading fnm via Homebrew...")
-            run("brew upgrade fnm", capture=False)
+            run(["brew", "upgrade", "fnm"], capture=False)
         else:
             typer.echo("Installing fnm via Homebrew...")
-            run("brew install fnm", capture=False)
+            run(["brew", "install", "fnm"], capture=False)
     else:
         typer.echo("Installing fnm via official installer...")
-        run("curl -fsSL https://fnm.vercel.app/install | bash", capture=False)
+        run(["bash", "-c", "curl -fsSL https://fnm.vercel.app/install | bash"], capture=False)
 
 
 def ensure_fnm(yes: bool = False, check_update: bool = True) -> None:
@@ -118,8 +313,7 @@ def ensure_fnm(yes: bool = False, check_update: bool = True) -> None:
 
     # Check for updates
     if check_update:
-        current = get_fnm_version()
-        latest = get_latest_fnm_version()
+        current, latest = gather(get_fnm_version, get_latest_fnm_version)
 
         if current and latest and parse_version(current) < parse_version(latest):
             from_brew = is_fnm_from_homebrew()
@@ -130,152 +324,801 @@ def ensure_fnm(yes: bool = False, check_update: bool = True) -> None:
                 typer.secho(f"fnm updated to {latest}", fg=typer.colors.GREEN)
 
 
-def get_default_version() -> str:
-    """Get default fnm version."""
+def version_key(version: str) -> tuple[int, ...]:
+    """Sort key for "v22.1.0"-style versions."""
+    return parse_version(version.lstrip("v"))
+
+
+@dataclass
+class NodeInstall:
+    """One installed Node version as laid out in $FNM_DIR/node-versions."""
+
+    version: str
+    path: Path
+    aliases: tuple[str, ...] = ()
+
+    @cached_property
+    def size(self) -> int:
+        """Bytes on disk (walks the tree on first access)."""
+        return dir_size(self.path)
+
+
+def dir_size(path: Path) -> int:
+    """Bytes allocated on disk under path, without following symlinks."""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        st = entry.stat(follow_symlinks=False)
+                        total += getattr(st, "st_blocks", 0) * 512 or st.st_size
+        except OSError:
+            continue
+    return total
+
+
+def find_fnm_dir() -> Path | None:
+    """
+    fnm's base dir, checked the way fnm does: only $FNM_DIR if it's set, else legacy
+    ~/.fnm, then XDG/macOS data dirs. None if that has no node-versions, so callers
+    ask `fnm list` instead of reading some other fnm's installs.
+    """
+    home = Path.home()
+    if os.environ.get("FNM_DIR"):
+        candidates = [Path(os.environ["FNM_DIR"])]
+    else:
+        candidates = [
+            home / ".fnm",
+            Path(os.environ.get("XDG_DATA_HOME") or home / ".local" / "share") / "fnm",
+            home / "Library" / "Application Support" / "fnm",
+        ]
+    for candidate in candidates:
+        if (candidate / "node-versions").is_dir():
+            return candidate
+    return None
+
+
+def inspect_fnm_dir(fnm_dir: Path) -> list[NodeInstall] | None:
+    """
+    Read installed versions and aliases straight from an fnm dir, no subprocess.
+    Expects node-versions/<version>/installation and aliases/<name> symlinks into it.
+    Returns installs sorted oldest first, or None if the layout isn't recognized.
+    """
+    versions_dir = fnm_dir / "node-versions"
     try:
-        output = run("fnm list")
-        for line in output.splitlines():
-            if "default" in line:
-                parts = line.replace("*", "").strip().split()
-                if parts:
-                    return parts[0]
-    except subprocess.CalledProcessError:
+        installs = {
+            entry.name: NodeInstall(entry.name, Path(entry.path) / "installation")
+            for entry in os.scandir(versions_dir)
+            if entry.name.startswith("v") and entry.is_dir()
+        }
+    except OSError:
+        return None
+    if any(not install.path.is_dir() for install in installs.values()):
+        return None
+
+    aliases: dict[str, list[str]] = {}
+    try:
+        for entry in os.scandir(fnm_dir / "aliases"):
+            if not entry.is_symlink():
+                return None
+            # aliases/default -> .../node-versions/v22.11.0/installation
+            target = Path(os.readlink(entry.path))
+            if target.name == "installation":
+                aliases.setdefault(target.parent.name, []).append(entry.name)
+    except FileNotFoundError:
         pass
-    return "none"
+    except OSError:
+        return None
+
+    for version, names in aliases.items():
+        if version in installs:
+            installs[version].aliases = tuple(sorted(names))
+    return sorted(installs.values(), key=lambda i: version_key(i.version))
+
+
+@dataclass(frozen=True)
+class LocalState:
+    """Installed versions and the default alias, from the fnm dir or `fnm list`."""
+
+    versions: tuple[str, ...]
+    default: str
+    installs: tuple[NodeInstall, ...] = ()  # empty when read from `fnm list`
+
+    @property
+    def latest(self) -> str:
+        return max(self.versions, key=version_key) if self.versions else "none"
+
+
+@dataclass(frozen=True)
+class RemoteIndex:
+    """Parsed `fnm list-remote`: every available version, and LTS versions with their codename."""
+
+    versions: tuple[str, ...]
+    lts: dict[str, str]  # {"v22.11.0": "Jod", ...}
+
+    @property
+    def latest(self) -> str:
+        return self.versions[-1] if self.versions else "unknown"
+
+    @property
+    def latest_lts(self) -> str:
+        lts = [v for v in self.versions if v in self.lts]
+        return lts[-1] if lts else "unknown"
+
+
+def parse_fnm_list(output: str) -> LocalState:
+    """Parse `fnm list` lines like "* v22.1.0 default, lts-latest"."""
+    versions = []
+    default = "none"
+    for line in output.splitlines():
+        parts = line.replace("*", "").strip().split()
+        if not parts:
+            continue
+        if parts[0].startswith("v"):
+            versions.append(parts[0])
+        if "default" in line:
+            default = parts[0]
+    return LocalState(tuple(versions), default)
+
+
+def parse_list_remote(output: str) -> RemoteIndex:
+    """Parse `fnm list-remote` lines like "v22.11.0 (Jod)"; a codename marks LTS."""
+    versions = []
+    lts = {}
+    for line in output.strip().splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        versions.append(parts[0])
+        if len(parts) > 1 and parts[1].startswith("("):
+            lts[parts[0]] = parts[1].strip("()")
+    return RemoteIndex(tuple(versions), lts)
+
+
+def parse_node_index(body: bytes) -> list[list]:
+    """Slim the Node dist index.json (newest first) to [[version, lts codename or false], ...]."""
+    return [[entry["version"], entry.get("lts", False)] for entry in json.loads(body)]
+
+
+# Snapshots are taken once per process so each fnm subprocess runs at most once.
+# Anything that installs or removes a version must call local_state.cache_clear().
+@cache
+def local_state() -> LocalState:
+    """Snapshot of installed versions, read from $FNM_DIR, or `fnm list` if its layout is unfamiliar."""
+    fnm_dir = find_fnm_dir()
+    installs = inspect_fnm_dir(fnm_dir) if fnm_dir else None
+    if installs is not None:
+        default = next((i.version for i in installs if "default" in i.aliases), None)
+        if default is None:
+            # A default alias that doesn't point into node-versions is `fnm default system`
+            default = "system" if (fnm_dir / "aliases" / "default").is_symlink() else "none"
+        return LocalState(tuple(i.version for i in installs), default, tuple(installs))
+    try:
+        return parse_fnm_list(run(["fnm", "list"], timeout=PROBE_TIMEOUT))
+    except subprocess.SubprocessError:
+        return LocalState((), "none")
+
+
+@cache
+def remote_index() -> RemoteIndex:
+    """Snapshot of the Node release index (the same one `fnm list-remote` reads).
+
+    Served from the on-disk cache; falls back to `fnm list-remote` if the index
+    can't be fetched and nothing is cached. Exits with an error under --offline
+    when nothing is cached, rather than carrying on with no releases.
+    """
+    releases = cached_fetch("node-index", f"{NODE_DIST_MIRROR}/index.json", parse_node_index)
+    if releases is not None:
+        releases = releases[::-1]
+        return RemoteIndex(
+            tuple(version for version, _ in releases),
+            {version: lts for version, lts in releases if lts},
+        )
+    if cache_settings.offline:
+        typer.secho("No cached release index; rerun without --offline.", fg=typer.colors.RED, err=True)
+        raise typer.Exit(1)
+    return parse_list_remote(run(["fnm", "list-remote"], timeout=PROBE_TIMEOUT))
+
+
+def get_default_version() -> str:
+    """Get default fnm version."""
+    return local_state().default
 
 
 def get_installed_versions() -> list[str]:
     """Get list of installed Node.js versions."""
+    return list(local_state().versions)
+
+
+def get_locked_global_packages(using: str | None = None) -> list[dict]:
+    """
+    Get globally installed npm packages (excluding builtins) with exact versions,
+    from the current Node or, with using, from that version or alias.
+    Returns [{"name": "typescript", "version": "5.6.3", "resolved": "https://...tgz",
+    "integrity": "sha512-..."}, ...]; resolved/integrity are None when npm doesn't know them.
+    """
+    prefix = ["fnm", "exec", f"--using={using}"] if using else []
     try:
-        output = run("fnm list")
-        versions = []
-        for line in output.splitlines():
-            parts = line.replace("*", "").strip().split()
-            if parts and parts[0].startswith("v"):
-                versions.append(parts[0])
-        return versions
-    except subprocess.CalledProcessError:
+        output = run([*prefix, "npm", "ls", "-g", "--depth=0", "--json", "--long"], timeout=PROBE_TIMEOUT)
+        data = json.loads(output)
+    except (subprocess.SubprocessError, json.JSONDecodeError):
         return []
+    return [
+        {
+            "name": name,
+            "version": info.get("version"),
+            "resolved": info.get("resolved") or info.get("_resolved"),
+            "integrity": info.get("integrity") or info.get("_integrity"),
+        }
+        for name, info in data.get("dependencies", {}).items()
+        if name not in ("npm", "corepack")
+    ]
 
 
 def get_global_packages() -> list[str]:
     """Get list of globally installed npm packages (excluding builtins)."""
-    try:
-        output = run("npm ls -g --depth=0 --json")
-        data = json.loads(output)
-        deps = data.get("dependencies", {})
-        return [pkg for pkg in deps.keys() if pkg not in ("npm", "corepack")]
-    except (subprocess.CalledProcessError, json.JSONDecodeError):
-        return []
+    return [pkg["name"] for pkg in get_locked_global_packages()]
+
+
+def write_manifest(packages: list[dict], node_version: str, path: Path = MANIFEST_PATH) -> Path:
+    """Write a lockfile-style manifest of global packages, replacing any previous one."""
+    manifest = {
+        "lockfileVersion": 1,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "node": node_version,
+        "packages": {
+            pkg["name"]: {k: pkg[k] for k in ("version", "resolved", "integrity")}
+            for pkg in packages
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2) + "\n")
+    tmp.replace(path)
+    return path
+
+
+def manifest_specs(manifest: dict) -> list[str]:
+    """
+    Turn manifest entries into exact npm install specs.
+    Registry packages pin name@version; anything else (git, file, custom tarball)
+    installs from its resolved location.
+    """
+    specs = []
+    for name, info in manifest.get("packages", {}).items():
+        resolved = info.get("resolved") or ""
+        if resolved and "/-/" not in resolved:
+            specs.append(f"{name}@{resolved}")
+        elif info.get("version"):
+            specs.append(f"{name}@{info['version']}")
+        else:
+            specs.append(name)
+    return specs
+
+
+def integrity_mismatches(expected: dict[str, dict], installed: list[dict]) -> tuple[list[str], list[str]]:
+    """
+    Compare installed packages' integrity hashes with manifest entries ({name: {"integrity": ...}}).
+    Returns (mismatched, unverified): "name (expected sha512-..., got sha512-...)" for
+    each package whose hash differs, and names missing a hash on either side.
+    """
+    actual = {pkg["name"]: pkg.get("integrity") for pkg in installed}
+    mismatched, unverified = [], []
+    for name, info in expected.items():
+        want, got = info.get("integrity"), actual.get(name)
+        if not want or not got:
+            unverified.append(name)
+        elif want != got:
+            mismatched.append(f"{name} (expected {want}, got {got})")
+    return mismatched, unverified
 
 
 def get_latest_lts() -> str:
     """Get latest LTS version available."""
-    output = run("fnm list-remote --lts")
-    lines = output.strip().splitlines()
-    if lines:
-        return lines[-1].split()[0]
-    return "unknown"
+    return remote_index().latest_lts
 
 
 def get_latest_version() -> str:
     """Get latest Node.js version available (including non-LTS)."""
-    output = run("fnm list-remote")
-    lines = output.strip().splitlines()
-    if lines:
-        return lines[-1].split()[0]
-    return "unknown"
-
-
-def get_latest_installed() -> str:
-    """Get latest installed Node.js version."""
-    versions = get_installed_versions()
-    node_versions = [v for v in versions if v.startswith("v")]
-    if node_versions:
-        sorted_versions = sorted(
-            node_versions,
-            key=lambda v: tuple(int(x) for x in v[1:].split(".")),
-            reverse=True,
-        )
-        return sorted_versions[0]
-    return "none"
+    return remote_index().latest
 
 
-def get_latest_installed_lts(installed: list[str]) -> str:
-    """Get latest installed LTS version by checking against remote LTS list."""
+def install_global_packages(
+    packages: list[str], using: str = "lts-latest", jobs: int = 4, npm_args: tuple[str, ...] = ()
+) -> tuple[list[str], list[str]]:
+    """
+    Install npm packages globally into a Node version, all in one npm call.
+    If the batch fails (npm rolls back the whole batch), retry each package on its
+    own with up to `jobs` installs running at once.
+    Returns (installed, failed), both in input order.
+    """
+    install_cmd = ["fnm", "exec", f"--using={using}", "npm", "install", "-g", *npm_args]
     try:
-        output = run("fnm list-remote --lts")
-        lts_versions = {line.split()[0] for line in output.strip().splitlines()}
-        installed_lts = [v for v in installed if v in lts_versions]
-        if installed_lts:
-            sorted_versions = sorted(
-                installed_lts,
-                key=lambda v: tuple(int(x) for x in v[1:].split(".")),
-                reverse=True,
-            )
-            return sorted_versions[0]
+        run([*install_cmd, *packages], capture=False)
+        return list(packages), []
     except subprocess.CalledProcessError:
-        pass
-    return "none"
+        typer.secho(f"\nBatch install failed, retrying {len(packages)} package(s) individually...", fg=typer.colors.YELLOW)
+
+    def install_one(pkg: str) -> bool:
+        try:
+            # Captured so parallel npm output doesn't interleave
+            run([*install_cmd, pkg])
+            return True
+        except subprocess.CalledProcessError:
+            return False
+
+    ok = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(install_one, pkg): pkg for pkg in packages}
+        for future in as_completed(futures):
+            pkg = futures[future]
+            ok[pkg] = future.result()
+            if ok[pkg]:
+                typer.echo(f"  Installed: {pkg}")
+            else:
+                typer.secho(f"  Failed: {pkg}", fg=typer.colors.RED)
+
+    return [p for p in packages if ok[p]], [p for p in packages if not ok[p]]
+
+
+_COMPARATOR = re.compile(r"^(<=|>=|<|>|=|\^|~>?)?v?((?:\d+|[xX*])(?:\.(?:\d+|[xX*])){0,2})$")
+
+
+def _bump(nums: list[int]) -> tuple[int, int, int]:
+    """Smallest version above a partial one: [18] -> (19, 0, 0), [18, 2] -> (18, 3, 0)."""
+    bumped = nums[:-1] + [nums[-1] + 1]
+    return tuple(bumped + [0] * (3 - len(bumped)))
+
+
+def _desugar(op: str, nums: list[int]) -> list[tuple[str, tuple[int, int, int]]]:
+    """One npm-style comparator (possibly partial, caret or tilde) as plain comparators."""
+    n = len(nums)
+    low = tuple(nums + [0] * (3 - n))
+    if n == 0:
+        return [("<", (0, 0, 0))] if op in ("<", ">") else []
+    if op in ("", "="):
+        return [("=", low)] if n == 3 else [(">=", low), ("<", _bump(nums))]
+    if op == "^":
+        if nums[0] > 0 or n == 1:
+            upper = (nums[0] + 1, 0, 0)
+        elif n == 2 or nums[1] > 0:
+            upper = (0, nums[1] + 1, 0)
+        else:
+            upper = (0, 0, nums[2] + 1)
+        return [(">=", low), ("<", upper)]
+    if op in ("~", "~>"):
+        return [(">=", low), ("<", _bump(nums[:2]))]
+    if op == ">":
+        return [(">", low)] if n == 3 else [(">=", _bump(nums))]
+    if op == "<=":
+        return [("<=", low)] if n == 3 else [("<", _bump(nums))]
+    return [(op, low)]
+
+
+def parse_range(spec: str) -> list[list[tuple[str, tuple[int, int, int]]]] | None:
+    """
+    Parse an npm semver range into OR-ed groups of AND-ed comparators.
+    "^18.2 || >=20 <21" -> [[(">=", (18, 2, 0)), ("<", (19, 0, 0))], [(">=", (20, 0, 0)), ("<", (21, 0, 0))]]
+    Bare partial versions are x-ranges ("20" means 20.x). Returns None if spec isn't a range.
+    """
+    groups = []
+    for part in spec.split("||"):
+        part = part.strip()
+        comparators = []
+        if " - " in part:
+            low, high = (p.strip() for p in part.split(" - ", 1))
+            tokens = [f">={low}", f"<={high}"]
+        else:
+            # ">= 18" -> ">=18"
+            tokens = re.sub(r"(<=|>=|<|>|=|\^|~>?)\s+", r"\1", part).split() or ["*"]
+        for token in tokens:
+            m = _COMPARATOR.match(token)
+            if not m:
+                return None
+            nums = []
+            for x in m.group(2).split("."):
+                if not x.isdigit():
+                    break
+                nums.append(int(x))
+            comparators.extend(_desugar(m.group(1) or "", nums))
+        groups.append(comparators)
+    return groups
+
+
+def satisfies(version: str, groups: list[list[tuple[str, tuple[int, int, int]]]]) -> bool:
+    """Whether version matches a parse_range() result."""
+    v = (version_key(version) + (0, 0, 0))[:3]
+    checks = {
+        "=": lambda t: v == t, "<": lambda t: v < t, "<=": lambda t: v <= t,
+        ">": lambda t: v > t, ">=": lambda t: v >= t,
+    }
+    return any(all(checks[op](target) for op, target in group) for group in groups)
+
+
+def matching_versions(spec: str, versions: list[str], lts: dict[str, str] | None = None) -> list[str]:
+    """
+    The versions satisfying a .nvmrc / engines.node style spec, in their original order:
+    "22", "v22.1", "^20.9 || >=22", "lts/*", "lts/iron", "node". lts maps LTS versions
+    to their codename. Empty if nothing matches or the spec isn't understood.
+    """
+    lts = lts or {}
+    spec = spec.strip()
+    lowered = spec.lower()
+    if lowered in ("lts", "lts-latest", "lts/*"):
+        matches = [v for v in versions if v in lts]
+    elif lowered.startswith("lts/"):
+        matches = [v for v in versions if lts.get(v, "").lower() == lowered[4:]]
+    elif lowered in ("latest", "node", "current"):
+        matches = list(versions)
+    else:
+        groups = parse_range(spec)
+        matches = [v for v in versions if satisfies(v, groups)] if groups else []
+    return matches
+
+
+def match_version(spec: str, versions: list[str], lts: dict[str, str] | None = None) -> str | None:
+    """Newest of versions (sorted oldest first) satisfying spec (see matching_versions), or None."""
+    matches = matching_versions(spec, versions, lts)
+    return matches[-1] if matches else None
+
+
+def resolve_version(spec: str) -> str:
+    """
+    Resolve a user version spec against the remote index (see match_version).
+    Anything unresolved is returned unchanged for fnm to resolve.
+    """
+    index = remote_index()
+    return match_version(spec, index.versions, index.lts) or spec.strip()
+
+
+def install_targets(extra_versions: Sequence[str] = ()) -> dict[str, str]:
+    """
+    Versions install/upgrade want, with display labels.
+    Returns {"v23.1.0": "latest", "v22.11.0": "LTS", "v18.20.4": "requested"}.
+    """
+    targets = {get_latest_version(): "latest", get_latest_lts(): "LTS"}
+    for item in extra_versions:
+        for spec in item.split(","):
+            if spec.strip():
+                targets.setdefault(resolve_version(spec), "requested")
+    return targets
+
+
+def install_node_versions(versions: list[str], parallel: int = 2) -> dict[str, bool]:
+    """
+    Install Node versions concurrently, at most `parallel` at once, prefixing each
+    output line with its version. A failed install doesn't stop the others.
+    Versions are installed exactly as given; the latest LTS is then aliased as
+    lts-latest (`fnm install --lts` would resolve against fnm's own, possibly
+    newer, index and install something other than what's reported).
+    Returns {version: succeeded}.
+    """
+    latest_lts = get_latest_lts()
+
+    async def _install_all():
+        limit = asyncio.Semaphore(max(1, parallel))
 
+        async def install_one(version: str) -> bool:
+            async with limit:
+                try:
+                    await arun(["fnm", "install", version], prefix=f"[{version}] ")
+                except subprocess.SubprocessError:
+                    return False
+                if version == latest_lts:
+                    await arun(["fnm", "alias", version, "lts-latest"], check=False)
+                return True
 
-def do_install(yes: bool = False) -> tuple[str, str, bool, bool]:
+        return await asyncio.gather(*(install_one(v) for v in versions))
+
+    results = dict(zip(versions, asyncio.run(_install_all())))
+    local_state.cache_clear()
+    return results
+
+
+def do_install(
+    yes: bool = False, versions: Sequence[str] = (), parallel: int = 2
+) -> tuple[str, str, dict[str, str], dict[str, bool]]:
     """
-    Core install logic: install latest + LTS, set LTS as default.
-    Returns (latest, latest_lts, installed_latest, installed_lts).
+    Core install logic: install latest + LTS (+ requested versions), set LTS as default.
+    Returns (latest, latest_lts, targets, results) where targets is install_targets()
+    and results has {version: succeeded} for every version that needed installing.
     """
     latest = get_latest_version()
     latest_lts = get_latest_lts()
+    targets = install_targets(versions)
     installed = set(get_installed_versions())
 
     typer.echo(f"Latest available: {latest}")
     typer.echo(f"Latest LTS: {latest_lts}")
 
-    to_install = []
-    if latest not in installed:
-        to_install.append(f"{latest} (latest)")
-    if latest_lts not in installed:
-        to_install.append(f"{latest_lts} (LTS)")
-
+    to_install = [v for v in targets if v not in installed]
     if to_install:
-        typer.echo(f"\nWill install: {', '.join(to_install)}")
+        typer.echo(f"\nWill install: {', '.join(f'{v} ({targets[v]})' for v in to_install)}")
     typer.echo(f"Will set default: {latest_lts} (LTS)")
 
     if not yes and not typer.confirm("\nProceed?", default=True):
         typer.echo("Aborted.")
         raise typer.Exit(0)
 
-    # Install latest (non-LTS) if needed
-    installed_latest = False
-    if latest not in installed:
-        typer.echo(f"\nInstalling {latest}...")
-        run(f"fnm install {latest}", capture=False)
-        installed_latest = True
-
-    # Install latest LTS if needed
-    installed_lts = False
-    if latest_lts not in installed:
-        typer.echo(f"\nInstalling {latest_lts} (LTS)...")
-        run("fnm install --lts", capture=False)
-        installed_lts = True
+    results = {}
+    if to_install:
+        typer.echo(f"\nInstalling {len(to_install)} version(s), {max(1, parallel)} at a time...")
+        results = install_node_versions(to_install, parallel)
 
     # Set default to LTS
-    typer.echo(f"\nSetting default to {latest_lts}...")
-    run("fnm default lts-latest")
+    if results.get(latest_lts, True):
+        typer.echo(f"\nSetting default to {latest_lts}...")
+        run(["fnm", "default", latest_lts])
+        local_state.cache_clear()
+
+    return latest, latest_lts, targets, results
+
+
+def install_result(latest: str, latest_lts: str, targets: dict[str, str], results: dict[str, bool]) -> dict:
+    """--json fields for do_install() / install_node_versions() outcomes."""
+    return {
+        "latest": latest,
+        "latest_lts": latest_lts,
+        "versions": [
+            {"version": v, "label": label, "status": "present" if v not in results else "installed" if results[v] else "failed"}
+            for v, label in targets.items()
+        ],
+        "failures": [{"version": v} for v, ok in results.items() if not ok],
+    }
+
+
+def print_install_summary(targets: dict[str, str], results: dict[str, bool], show_existing: bool = True) -> None:
+    """Summary lines for install_targets() after install_node_versions()."""
+    for version, label in targets.items():
+        if version not in results:
+            if show_existing:
+                typer.echo(f"Already had: {version} ({label})")
+        elif results[version]:
+            typer.secho(f"Installed: {version} ({label})", fg=typer.colors.GREEN)
+        else:
+            typer.secho(f"Failed: {version} ({label})", fg=typer.colors.RED)
+
+
+def format_size(n: int) -> str:
+    """Human-readable bytes: 1536 -> "1.5 KB"."""
+    size = float(n)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def measure_sizes(installs: tuple[NodeInstall, ...], jobs: int = 4) -> dict[str, int]:
+    """Walk install dirs concurrently. Returns {version: bytes on disk}."""
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        return dict(zip((i.version for i in installs), pool.map(lambda i: i.size, installs)))
+
+
+CODE_DIR = Path.home() / "code"  # same default as gitcloneall.py
+VERSION_FILES = (".node-version", ".nvmrc")
+SKIP_DIRS = {"node_modules", ".git"}
+
+
+def _walk_for(root: Path, names: tuple[str, ...]) -> list[Path]:
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        found.extend(Path(dirpath) / name for name in filenames if name in names)
+    return found
+
+
+def find_version_files(root: Path, names: tuple[str, ...] = VERSION_FILES, jobs: int = 1) -> list[Path]:
+    """
+    Every file called one of names under root, skipping node_modules and .git.
+    Top-level directories are walked in parallel across `jobs` threads.
+    """
+    try:
+        top = list(os.scandir(root))
+    except OSError:
+        return []
+    found = [Path(e.path) for e in top if e.name in names and e.is_file()]
+    subdirs = [Path(e.path) for e in top if e.name not in SKIP_DIRS and e.is_dir(follow_symlinks=False)]
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for paths in pool.map(lambda d: _walk_for(d, names), subdirs):
+            found.extend(paths)
+    return sorted(found)
+
+
+def read_version_file(path: Path) -> str | None:
+    """First meaningful line of a .nvmrc / .node-version, e.g. "20" or "lts/*"."""
+    try:
+        for line in path.read_text().splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                return line
+    except (OSError, UnicodeDecodeError):
+        pass
+    return None
+
+
+def read_node_constraint(path: Path) -> str | None:
+    """Node version spec from a .nvmrc / .node-version, or engines.node from a package.json."""
+    if path.name != "package.json":
+        return read_version_file(path)
+    try:
+        engines = json.loads(path.read_text()).get("engines")
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError, AttributeError):
+        return None
+    node = engines.get("node") if isinstance(engines, dict) else None
+    return (node.strip() or None) if isinstance(node, str) else None
+
 
-    return latest, latest_lts, installed_latest, installed_lts
+def pick_versions(candidates: list[list[str]], installed: set[str]) -> list[str]:
+    """
+    Smallest set of versions to install so every constraint has one (greedy set cover).
+    candidates holds each constraint's satisfying versions, oldest first; constraints that
+    an installed version already satisfies, or that nothing satisfies, are skipped.
+    Ties go to the newest version.
+    """
+    pending = [set(c) for c in candidates if c and not installed.intersection(c)]
+    chosen = []
+    while pending:
+        pool = set().union(*pending)
+        best = max(pool, key=lambda v: (sum(v in c for c in pending), version_key(v)))
+        chosen.append(best)
+        pending = [c for c in pending if best not in c]
+    return sorted(chosen, key=version_key)
+
+
+def retention_reasons(
+    state: LocalState,
+    lts: dict[str, str],
+    keep_per_major: int = 0,
+    used_under: list[Path] = (),
+    newer_than_days: int | None = None,
+) -> dict[str, list[str]]:
+    """
+    Why each installed version should be kept; versions missing from the result can go.
+    Always keeps the latest installed and latest installed LTS, then applies the policy:
+    the N newest per major, versions a .nvmrc/.node-version under used_under resolves to,
+    and versions installed within newer_than_days.
+    Returns {"v22.11.0": ["latest", "LTS"], "v20.10.0": ["~/code/app/.nvmrc"], ...}.
+    """
+    versions = sorted(state.versions, key=version_key)
+    reasons: dict[str, list[str]] = {}
+
+    def keep(version: str | None, reason: str) -> None:
+        if version in state.versions:
+            reasons.setdefault(version, []).append(reason)
+
+    keep(state.latest, "latest")
+    keep(match_version("lts", versions, lts), "LTS")
+
+    if keep_per_major > 0:
+        by_major: dict[int, list[str]] = {}
+        for version in versions:
+            by_major.setdefault(version_key(version)[0], []).append(version)
+        for major_versions in by_major.values():
+            for version in major_versions[-keep_per_major:]:
+                keep(version, f"newest {keep_per_major} of v{version_key(version)[0]}")
+
+    home = str(Path.home())
+    for root in used_under:
+        for path in find_version_files(root):
+            spec = read_version_file(path)
+            if spec:
+                keep(match_version(spec, versions, lts), str(path).replace(home, "~", 1))
+
+    if newer_than_days is not None:
+        cutoff = time.time() - newer_than_days * 86400
+        for install in state.installs:
+            try:
+                # node-versions/<version> is created at install time
+                if install.path.parent.stat().st_mtime >= cutoff:
+                    keep(install.version, f"installed < {newer_than_days}d ago")
+            except OSError:
+                pass
+
+    return reasons
+
+
+def uninstall_versions(versions: list[str], parallel: int = 4) -> dict[str, bool]:
+    """Uninstall Node versions concurrently. Returns {version: succeeded}."""
+
+    async def _uninstall_all():
+        limit = asyncio.Semaphore(max(1, parallel))
+
+        async def uninstall_one(version: str) -> bool:
+            async with limit:
+                try:
+                    await arun(["fnm", "uninstall", version], prefix=f"[{version}] ")
+                    return True
+                except subprocess.SubprocessError:
+                    return False
+
+        return await asyncio.gather(*(uninstall_one(v) for v in versions))
+
+    results = dict(zip(versions, asyncio.run(_uninstall_all())))
+    local_state.cache_clear()
+    return results
+
+
+def json_result(ctx: typer.Context, enabled: bool, command: str) -> dict:
+    """
+    The dict a command fills in for --json. When enabled, human-readable output moves
+    to stderr until ctx closes, and main() prints the dict to stdout as JSON once the
+    command ends (early exits included). Nested commands (upgrade -> install) share one dict.
+    """
+    if output_settings.json_result is not None:
+        return output_settings.json_result
+    result = {"command": command}
+    if enabled:
+        output_settings.json_result = result
+        ctx.with_resource(contextlib.redirect_stdout(sys.stderr))
+    return result
+
+
+def print_timings() -> None:
+    """Per-call and per-kind wall times on stderr."""
+    wall = time.perf_counter() - STARTED
+    typer.echo(f"\nTimings ({len(timings)} calls, {wall:.2f}s wall):", err=True)
+    for t in sorted(timings, key=lambda t: t.start):
+        flag = "" if t.ok else "  (failed)"
+        typer.echo(f"  +{t.start:6.2f}s {t.duration:7.3f}s  {t.name}{flag}", err=True)
+    by_kind: dict[str, list[float]] = {}
+    for t in timings:
+        by_kind.setdefault(t.kind, []).append(t.duration)
+    typer.echo("By kind:", err=True)
+    for kind, durations in sorted(by_kind.items(), key=lambda kv: -sum(kv[1])):
+        typer.echo(f"  {sum(durations):7.3f}s  {len(durations):>3}x  {kind}", err=True)
+
+
+def write_trace(path: Path) -> None:
+    """Export `timings` as a Chrome trace-event file (chrome://tracing, ui.perfetto.dev)."""
+    lanes: list[float] = []  # end time of the last event in each row
+    events = []
+    for t in sorted(timings, key=lambda t: t.start):
+        lane = next((i for i, end in enumerate(lanes) if end <= t.start), len(lanes))
+        if lane == len(lanes):
+            lanes.append(0.0)
+        lanes[lane] = t.start + t.duration
+        events.append({
+            "name": t.name, "cat": t.kind, "ph": "X", "pid": os.getpid(), "tid": lane,
+            "ts": round(t.start * 1e6), "dur": round(t.duration * 1e6), "args": {"ok": t.ok},
+        })
+    path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+
+def finish_output() -> None:
+    """Print the --json result and timing reports once the command is done."""
+    result = output_settings.json_result
+    if result is not None:
+        output_settings.json_result = None
+        if output_settings.timings:
+            result["timings"] = [asdict(t) for t in timings]
+        typer.echo(json.dumps(result, indent=2))
+    if output_settings.timings:
+        print_timings()
+    if output_settings.trace:
+        write_trace(output_settings.trace)
+        typer.echo(f"Trace written to {output_settings.trace}", err=True)
 
 
 @app.command()
-def status():
+def status(
+    ctx: typer.Context,
+    json_out: Annotated[bool, typer.Option("--json", help="Print the result as JSON on stdout (text goes to stderr)")] = False,
+):
     """Show current Node.js status: versions, default, and global packages."""
+    result = json_result(ctx, json_out, "status")
     ensure_fnm(check_update=False)
 
     typer.echo("=== fnm status ===\n")
 
-    # fnm version
-    fnm_version = get_fnm_version()
-    fnm_latest = get_latest_fnm_version()
+    # Independent probes run concurrently; the snapshots are read back below
+    fnm_version, fnm_latest, _, _, packages = gather(
+        get_fnm_version, get_latest_fnm_version, local_state, remote_index, get_global_packages
+    )
     fnm_source = "homebrew" if is_fnm_from_homebrew() else "standalone"
     if fnm_version:
         if fnm_latest and parse_version(fnm_version) < parse_version(fnm_latest):
@@ -287,13 +1130,22 @@ def status():
     default = get_default_version()
     latest = get_latest_version()
     latest_lts = get_latest_lts()
-    packages = get_global_packages()
 
     typer.echo(f"Installed: {', '.join(versions) if versions else '(none)'}")
     typer.echo(f"Default: {default}")
     typer.echo(f"Latest available: {latest}")
     typer.echo(f"Latest LTS: {latest_lts}")
 
+    result.update(
+        fnm={"version": fnm_version, "latest": fnm_latest, "source": fnm_source},
+        installed=versions,
+        default=default,
+        latest=latest,
+        latest_lts=latest_lts,
+        up_to_date=default == latest_lts,
+        packages=packages,
+    )
+
     if default == latest_lts:
         typer.secho("Up to date!", fg=typer.colors.GREEN)
     elif default == "none":
@@ -311,70 +1163,112 @@ def status():
 
 @app.command()
 def install(
+    ctx: typer.Context,
     yes: Annotated[bool, typer.Option("--yes", "-y", help="Skip confirmation")] = False,
+    versions: Annotated[
+        list[str], typer.Option("--versions", help="Extra versions to install, e.g. 20 or 18,v16.20.2")
+    ] = [],
+    parallel: Annotated[int, typer.Option("--parallel", "-p", help="Concurrent Node installs")] = 2,
+    json_out: Annotated[bool, typer.Option("--json", help="Print the result as JSON on stdout (text goes to stderr)")] = False,
 ):
     """Install latest Node.js and latest LTS, set LTS as default."""
+    result = json_result(ctx, json_out, "install")
     ensure_fnm(yes)
 
     typer.echo("=== fnm install ===\n")
 
+    gather(local_state, remote_index)
     installed = get_installed_versions()
     if installed:
         typer.echo(f"Already installed: {', '.join(installed)}")
         typer.echo("Use 'upgrade' to update existing installation.\n")
 
-    latest, latest_lts, installed_latest, installed_lts = do_install(yes)
+    latest, latest_lts, targets, results = do_install(yes, versions, parallel)
+    result.update(install_result(latest, latest_lts, targets, results))
+    result["default"] = get_default_version()
 
     # Summary
     typer.echo("\n" + "=" * 40)
     typer.secho("SUMMARY", bold=True)
     typer.echo("=" * 40)
 
-    if installed_latest:
-        typer.secho(f"Installed: {latest}", fg=typer.colors.GREEN)
-    else:
-        typer.echo(f"Already had: {latest}")
-    if installed_lts:
-        typer.secho(f"Installed: {latest_lts} (LTS)", fg=typer.colors.GREEN)
-    else:
-        typer.echo(f"Already had: {latest_lts} (LTS)")
+    print_install_summary(targets, results)
 
-    typer.echo(f"Default: {latest_lts}")
+    if results.get(latest_lts, True):
+        typer.echo(f"Default: {latest_lts}")
+    else:
+        typer.secho(f"Default: unchanged ({latest_lts} failed to install)", fg=typer.colors.RED)
+    if not all(results.values()):
+        raise typer.Exit(1)
     typer.echo("\nDone! Restart your shell or run: eval \"$(fnm env)\"")
 
 
 @app.command()
 def cleanup(
+    ctx: typer.Context,
     yes: Annotated[bool, typer.Option("--yes", "-y", help="Skip confirmation")] = False,
+    keep_per_major: Annotated[
+        int, typer.Option("--keep-per-major", help="Also keep the N newest versions of each major")
+    ] = 0,
+    keep_used_under: Annotated[
+        list[Path], typer.Option("--keep-used-under", help="Also keep versions a .nvmrc/.node-version under this dir needs")
+    ] = [],
+    keep_newer_than: Annotated[
+        int | None, typer.Option("--keep-newer-than", help="Also keep versions installed within this many days")
+    ] = None,
+    jobs: Annotated[int, typer.Option("--jobs", "-j", help="Parallel size scans and removals")] = 4,
+    json_out: Annotated[bool, typer.Option("--json", help="Print the result as JSON on stdout (text goes to stderr)")] = False,
 ):
-    """Remove old Node.js versions, keeping latest installed and latest installed LTS."""
+    """Remove old Node.js versions, keeping latest installed and latest installed LTS (plus any retention policy)."""
+    result = json_result(ctx, json_out, "cleanup")
     ensure_fnm()
 
-    versions = get_installed_versions()
-    latest_installed = get_latest_installed()
-    latest_installed_lts = get_latest_installed_lts(versions)
-    default = get_default_version()
-
-    # Keep: latest installed, latest installed LTS, and system
-    keep = {latest_installed, latest_installed_lts, "system"}
-    to_remove = [v for v in versions if v not in keep]
-
-    typer.echo(f"Installed: {', '.join(versions)}")
-    typer.echo(f"Latest installed: {latest_installed}")
-    typer.echo(f"Latest installed LTS: {latest_installed_lts}")
+    _, index = gather(local_state, remote_index)
+    state = local_state()
+    default = state.default
+
+    reasons = retention_reasons(state, index.lts, keep_per_major, keep_used_under, keep_newer_than)
+    if default in reasons:
+        reasons[default].append("default")
+    to_remove = [v for v in state.versions if v not in reasons]
+    kept = sorted(reasons, key=version_key)
+    new_default = match_version("lts", kept, index.lts) or state.latest
+    if keep_newer_than is not None and not state.installs:
+        typer.secho("Install dates unknown (fnm dir not readable); --keep-newer-than ignored.", fg=typer.colors.YELLOW)
+
+    sizes = measure_sizes(state.installs, jobs)
+    typer.echo("Installed:")
+    for version in state.versions:
+        size = format_size(sizes[version]) if version in sizes else "?"
+        verdict = f"keep ({', '.join(reasons[version])})" if version in reasons else "remove"
+        typer.echo(f"  {version:<12} {size:>10}  {verdict}")
     typer.echo(f"Default: {default}")
 
+    reclaim = sum(sizes.get(v, 0) for v in to_remove)
+    result.update(
+        installed=[{"version": v, "bytes": sizes.get(v), "keep": reasons.get(v, [])} for v in state.versions],
+        default=default,
+        actions=[{"action": "uninstall", "version": v} for v in to_remove],
+        reclaim_bytes=reclaim,
+        removed=[],
+        failures=[],
+    )
+    if default in to_remove:
+        result["actions"].insert(0, {"action": "set-default", "version": new_default})
+
     if not to_remove:
         typer.echo("\nNo old versions to remove.")
         raise typer.Exit(0)
 
-    typer.echo(f"\nKeeping: {', '.join(sorted(keep - {'system'}))}")
-    typer.secho(f"Will remove: {', '.join(to_remove)}", fg=typer.colors.YELLOW)
+    typer.secho(
+        f"\nWill remove: {', '.join(to_remove)} (reclaims {format_size(reclaim) if sizes else 'unknown space'})",
+        fg=typer.colors.YELLOW,
+    )
 
     # Warn if default will be removed
     if default in to_remove:
         typer.secho(f"\nWarning: Default ({default}) will be removed!", fg=typer.colors.RED)
-        typer.echo(f"New default will be set to: {latest_installed_lts}")
+        typer.echo(f"New default will be set to: {new_default}")
 
     if not yes and not typer.confirm("\nProceed?", default=True):
         typer.echo("Aborted.")
@@ -382,36 +1276,126 @@ def cleanup(
 
     # Update default if needed before removing
     if default in to_remove:
-        typer.echo(f"\nSetting new default to {latest_installed_lts}...")
-        run(f"fnm default {latest_installed_lts}")
+        typer.echo(f"\nSetting new default to {new_default}...")
+        run(["fnm", "default", new_default])
 
-    for version in to_remove:
-        typer.echo(f"Removing {version}...")
-        run(f"fnm uninstall {version}", capture=False, check=False)
+    typer.echo(f"\nRemoving {len(to_remove)} version(s)...")
+    results = uninstall_versions(to_remove, jobs)
+    removed = [v for v in to_remove if results[v]]
+    failed = [v for v in to_remove if not results[v]]
 
-    typer.secho(f"\nRemoved {len(to_remove)} version(s).", fg=typer.colors.GREEN)
+    freed = sum(sizes.get(v, 0) for v in removed)
+    result.update(removed=removed, failures=failed, freed_bytes=freed)
+    if default in to_remove:
+        result["default"] = new_default
+    typer.secho(f"\nRemoved {len(removed)} version(s), freed {format_size(freed)}.", fg=typer.colors.GREEN)
+    if failed:
+        typer.secho(f"Failed: {', '.join(failed)}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+
+@app.command()
+def scan(
+    root: Annotated[Path, typer.Argument(help="Directory of projects to scan")] = CODE_DIR,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Skip confirmation")] = False,
+    parallel: Annotated[int, typer.Option("--parallel", "-p", help="Concurrent Node installs")] = 2,
+    jobs: Annotated[int, typer.Option("--jobs", "-j", help="Parallel directory walkers")] = 8,
+):
+    """Install the fewest Node.js versions that satisfy every .nvmrc, .node-version and engines.node under a directory."""
+    ensure_fnm(yes, check_update=False)
+
+    typer.echo(f"=== fnm scan: {root} ===\n")
+
+    (files, _, index) = gather(
+        lambda: find_version_files(root, (*VERSION_FILES, "package.json"), jobs), local_state, remote_index
+    )
+    state = local_state()
+    installed = set(state.versions)
+
+    home = str(Path.home())
+    constraints = []
+    for path in files:
+        spec = read_node_constraint(path)
+        if spec:
+            constraints.append((str(path).replace(home, "~", 1), spec))
+    if not constraints:
+        typer.echo("No Node version constraints found.")
+        raise typer.Exit(0)
+
+    # Each constraint's satisfying releases; an installed match means nothing to do
+    candidates = []
+    unresolved = []
+    typer.echo(f"Constraints ({len(constraints)}):")
+    for source, spec in constraints:
+        matching = matching_versions(spec, index.versions, index.lts)
+        candidates.append(matching)
+        have = match_version(spec, state.versions, index.lts)
+        if have:
+            typer.echo(f"  {source}: {spec} -> {have} (installed)")
+        elif matching:
+            typer.echo(f"  {source}: {spec} -> {matching[-1]}")
+        else:
+            unresolved.append(source)
+            typer.secho(f"  {source}: {spec} -> no matching release", fg=typer.colors.RED)
+
+    to_install = pick_versions(candidates, installed)
+    if not to_install and unresolved:
+        typer.secho(f"\nNothing to install. Unresolved: {', '.join(unresolved)}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if not to_install:
+        typer.secho("\nEvery project is covered by an installed version.", fg=typer.colors.GREEN)
+        raise typer.Exit(0)
+
+    typer.echo(f"\nWill install: {', '.join(to_install)}")
+    if not yes and not typer.confirm("\nProceed?", default=True):
+        typer.echo("Aborted.")
+        raise typer.Exit(0)
+
+    typer.echo(f"\nInstalling {len(to_install)} version(s), {max(1, parallel)} at a time...")
+    results = install_node_versions(to_install, parallel)
+
+    typer.echo("\n" + "=" * 40)
+    typer.secho("SUMMARY", bold=True)
+    typer.echo("=" * 40)
+    print_install_summary({v: "needed" for v in to_install}, results)
+    if unresolved:
+        typer.secho(f"Unresolved: {', '.join(unresolved)}", fg=typer.colors.RED)
+    if unresolved or not all(results.values()):
+        raise typer.Exit(1)
 
 
 @app.command()
 def upgrade(
+    ctx: typer.Context,
     yes: Annotated[bool, typer.Option("--yes", "-y", help="Skip confirmation")] = False,
+    jobs: Annotated[
+        int, typer.Option("--jobs", "-j", help="Parallel npm installs when retrying packages individually")
+    ] = 4,
+    manifest: Annotated[Path, typer.Option("--manifest", help="Where to save the global package manifest")] = MANIFEST_PATH,
+    versions: Annotated[
+        list[str], typer.Option("--versions", help="Extra versions to install, e.g. 20 or 18,v16.20.2")
+    ] = [],
+    parallel: Annotated[int, typer.Option("--parallel", "-p", help="Concurrent Node installs")] = 2,
+    json_out: Annotated[bool, typer.Option("--json", help="Print the result as JSON on stdout (text goes to stderr)")] = False,
 ):
     """Upgrade to latest Node.js versions and reinstall global packages to LTS."""
+    result = json_result(ctx, json_out, "upgrade")
     ensure_fnm(yes)
 
     typer.echo("=== fnm upgrade ===\n")
 
-    # Check if any node is installed
+    # Check if any node is installed (remote index and packages are fetched alongside)
+    _, _, locked = gather(local_state, remote_index, get_locked_global_packages)
     installed = get_installed_versions()
     if not installed:
         typer.echo("No Node.js installed. Running install...\n")
-        install(yes=yes)
+        install(ctx, yes=yes, versions=versions, parallel=parallel, json_out=json_out)
         return
 
     old_default = get_default_version()
     typer.echo(f"Current default: {old_default}")
 
-    packages = get_global_packages()
+    packages = [pkg["name"] for pkg in locked]
     if packages:
         typer.echo(f"Global packages: {', '.join(packages)}")
     else:
@@ -423,15 +1407,26 @@ def upgrade(
     typer.echo(f"Latest LTS: {latest_lts}")
 
     # Check what needs to be done
+    targets = install_targets(versions)
     installed_set = set(installed)
-    to_install = []
-    if latest not in installed_set:
-        to_install.append(f"{latest} (latest)")
-    if latest_lts not in installed_set:
-        to_install.append(f"{latest_lts} (LTS)")
+    to_install = [v for v in targets if v not in installed_set]
 
     already_on_lts = old_default == latest_lts
 
+    actions = [{"action": "install", "version": v, "label": targets[v]} for v in to_install]
+    if not already_on_lts:
+        actions.append({"action": "set-default", "from": old_default, "to": latest_lts})
+    if packages:
+        actions.append({"action": "reinstall-packages", "packages": packages})
+    result.update(
+        installed=installed,
+        default=old_default,
+        latest=latest,
+        latest_lts=latest_lts,
+        packages=packages,
+        actions=actions,
+    )
+
     if not to_install and already_on_lts:
         typer.secho("\nAlready up to date. Nothing to do.", fg=typer.colors.GREEN)
         raise typer.Exit(0)
@@ -439,7 +1434,7 @@ def upgrade(
     # Show what will happen
     typer.echo("\nActions:")
     if to_install:
-        typer.echo(f"  Install: {', '.join(to_install)}")
+        typer.echo(f"  Install: {', '.join(f'{v} ({targets[v]})' for v in to_install)}")
     if not already_on_lts:
         typer.echo(f"  Set default: {old_default} -> {latest_lts}")
     if packages:
@@ -449,51 +1444,54 @@ def upgrade(
         typer.echo("Aborted.")
         raise typer.Exit(0)
 
-    # Install latest (non-LTS) if needed
-    installed_latest = False
-    if latest not in installed_set:
-        typer.echo(f"\nInstalling {latest}...")
-        run(f"fnm install {latest}", capture=False)
-        installed_latest = True
+    # Save exact versions first so `restore` can undo a bad upgrade
+    if locked:
+        path = write_manifest(locked, old_default, manifest)
+        result["manifest"] = str(path)
+        typer.echo(f"\nSaved global package manifest: {path}")
+
+    results = {}
+    if to_install:
+        typer.echo(f"\nInstalling {len(to_install)} version(s), {max(1, parallel)} at a time...")
+        results = install_node_versions(to_install, parallel)
 
-    # Install latest LTS if needed
-    installed_lts = False
-    if latest_lts not in installed_set:
-        typer.echo(f"\nInstalling {latest_lts} (LTS)...")
-        run("fnm install --lts", capture=False)
-        installed_lts = True
+    # Without the new LTS there's nothing to switch to or reinstall into
+    lts_ok = results.get(latest_lts, True)
+    if not lts_ok:
+        typer.secho(f"\n{latest_lts} (LTS) failed to install; keeping default and packages as they are.", fg=typer.colors.RED)
 
     # Set default to LTS
-    if not already_on_lts:
+    if not already_on_lts and lts_ok:
         typer.echo(f"\nSetting default to {latest_lts}...")
-        run("fnm default lts-latest")
+        run(["fnm", "default", latest_lts])
+        local_state.cache_clear()
 
     # Reinstall global packages to LTS
     reinstalled = []
     failed = []
-    if packages:
+    if packages and lts_ok:
         typer.echo(f"\nReinstalling {len(packages)} global package(s) to LTS...")
-        for pkg in packages:
-            try:
-                run(f"fnm exec --using=lts-latest npm install -g {pkg}", capture=False)
-                reinstalled.append(pkg)
-            except subprocess.CalledProcessError:
-                failed.append(pkg)
-                typer.secho(f"  Failed: {pkg}", fg=typer.colors.RED)
+        reinstalled, failed = install_global_packages(packages, using=latest_lts, jobs=jobs)
+
+    result.update(install_result(latest, latest_lts, targets, results))
+    result.update(
+        default=latest_lts if lts_ok else old_default,
+        reinstalled=reinstalled,
+        failures=result["failures"] + [{"package": pkg} for pkg in failed],
+    )
 
     # Summary
     typer.echo("\n" + "=" * 40)
     typer.secho("SUMMARY", bold=True)
     typer.echo("=" * 40)
 
-    if installed_latest:
-        typer.secho(f"Installed: {latest}", fg=typer.colors.GREEN)
-    if installed_lts:
-        typer.secho(f"Installed: {latest_lts} (LTS)", fg=typer.colors.GREEN)
-    if not already_on_lts:
+    print_install_summary(targets, results, show_existing=False)
+    if already_on_lts:
+        typer.echo(f"Default: {latest_lts} (unchanged)")
+    elif lts_ok:
         typer.echo(f"Default: {old_default} -> {latest_lts}")
     else:
-        typer.echo(f"Default: {latest_lts} (unchanged)")
+        typer.echo(f"Default: {old_default} (unchanged)")
 
     if reinstalled:
         typer.secho(f"Reinstalled: {', '.join(reinstalled)}", fg=typer.colors.GREEN)
@@ -502,11 +1500,86 @@ def upgrade(
     if not packages:
         typer.echo("No global packages to reinstall.")
 
+    if not all(results.values()):
+        raise typer.Exit(1)
     typer.echo("\nDone! Restart your shell or run: eval \"$(fnm env)\"")
 
 
+@app.command()
+def restore(
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="Skip confirmation")] = False,
+    using: Annotated[str, typer.Option("--using", help="Node version or alias to install into")] = "lts-latest",
+    manifest: Annotated[Path, typer.Option("--manifest", help="Manifest written by upgrade")] = MANIFEST_PATH,
+    prefer_offline: Annotated[
+        bool, typer.Option("--prefer-offline/--no-prefer-offline", help="Install from npm's cache when possible")
+    ] = True,
+    jobs: Annotated[
+        int, typer.Option("--jobs", "-j", help="Parallel npm installs when retrying packages individually")
+    ] = 4,
+):
+    """Reinstall the exact global packages recorded in the manifest into a Node version, checking their integrity."""
+    ensure_fnm(yes, check_update=False)
+
+    typer.echo("=== fnm restore ===\n")
+
+    try:
+        data = json.loads(manifest.read_text())
+    except (OSError, json.JSONDecodeError) as e:
+        typer.secho(f"Can't read manifest {manifest}: {e}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    specs = manifest_specs(data)
+    if not specs:
+        typer.echo("Manifest has no packages. Nothing to do.")
+        raise typer.Exit(0)
+
+    typer.echo(f"Manifest: {manifest} (saved {data.get('created', '?')} from {data.get('node', '?')})")
+    typer.echo(f"Target: {using}")
+    typer.echo(f"Packages ({len(specs)}):")
+    for spec in specs:
+        typer.echo(f"  - {spec}")
+
+    if not yes and not typer.confirm("\nProceed?", default=True):
+        typer.echo("Aborted.")
+        raise typer.Exit(0)
+
+    npm_args = ("--prefer-offline",) if prefer_offline else ()
+    typer.echo(f"\nInstalling {len(specs)} package(s) into {using}...")
+    restored, failed = install_global_packages(specs, using=using, jobs=jobs, npm_args=npm_args)
+
+    # The same tarballs as before the upgrade, not just the same version numbers
+    names = dict(zip(specs, data["packages"]))
+    expected = {names[spec]: data["packages"][names[spec]] for spec in restored}
+    mismatched, unverified = integrity_mismatches(expected, get_locked_global_packages(using)) if expected else ([], [])
+
+    typer.echo("\n" + "=" * 40)
+    typer.secho("SUMMARY", bold=True)
+    typer.echo("=" * 40)
+    if restored:
+        typer.secho(f"Restored: {', '.join(restored)}", fg=typer.colors.GREEN)
+    if expected and not mismatched and not unverified:
+        typer.secho("Integrity: all match the manifest", fg=typer.colors.GREEN)
+    if unverified:
+        typer.secho(f"Integrity not checked (no hash from npm): {', '.join(unverified)}", fg=typer.colors.YELLOW)
+    for mismatch in mismatched:
+        typer.secho(f"Integrity mismatch: {mismatch}", fg=typer.colors.RED)
+    if failed:
+        typer.secho(f"Failed: {', '.join(failed)}", fg=typer.colors.RED)
+    if failed or mismatched:
+        raise typer.Exit(1)
+
+
 @app.callback(invoke_without_command=True)
-def main(ctx: typer.Context):
+def main(
+    ctx: typer.Context,
+    offline: Annotated[bool, typer.Option("--offline", help="Use cached remote data only, no network")] = False,
+    refresh: Annotated[bool, typer.Option("--refresh", help="Revalidate cached remote data now")] = False,
+    cache_ttl: Annotated[
+        int, typer.Option("--cache-ttl", envvar="FNM_PY_CACHE_TTL", help="Seconds before cached remote data is revalidated")
+    ] = 3600,
+    show_timings: Annotated[bool, typer.Option("--timings", help="Print wall time of every subprocess and request")] = False,
+    trace: Annotated[Path | None, typer.Option("--trace", help="Write timings as a Chrome trace-event file")] = None,
+):
     """
     Manage Node.js versions via fnm with global package preservation.
 
@@ -517,10 +1590,19 @@ def main(ctx: typer.Context):
       install  - Fresh install: latest + LTS, set LTS as default
       upgrade  - Update to latest versions, reinstall global packages
       status   - Show current versions and packages
-      cleanup  - Remove old versions, keep latest + latest LTS
+      cleanup  - Remove old versions, keep latest + latest LTS (+ retention policy)
+      restore  - Reinstall exact global packages saved by the last upgrade
+      scan     - Install the versions projects under ~/code ask for
     """
+    cache_settings.ttl = cache_ttl
+    cache_settings.offline = offline
+    cache_settings.refresh = refresh
+    output_settings.timings = show_timings
+    output_settings.trace = trace
+    ctx.call_on_close(finish_output)
+
     if ctx.invoked_subcommand is None:
-        upgrade()
+        upgrade(ctx)
 
 
 if __name__ == "__main__":
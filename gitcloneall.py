@@ -10,98 +10,896 @@ Usage:
     uv run gitcloneall.py              # Clone all repos for default user
     uv run gitcloneall.py --user foo   # Clone for a different user
     uv run gitcloneall.py --list       # Just list repos without cloning
+    uv run gitcloneall.py --jobs 16    # Clone exactly 16 repos at once (default: adapt to throughput)
+    uv run gitcloneall.py --sync       # Also fetch + fast-forward existing clones
+    uv run gitcloneall.py --filter blob:none          # Partial (blobless) clones
+    uv run gitcloneall.py --large-mb 200              # Blobless only for repos over 200 MB
+    uv run gitcloneall.py --org foo --no-forks        # An org's repos, minus forks
+    uv run gitcloneall.py --starred --list            # Repos the user has starred
+    uv run gitcloneall.py --mine                      # Everything the token owns, incl. private
+    uv run gitcloneall.py --no-archived --language python --pushed-since 2025-01-01 --match 'ai-*'
+    uv run gitcloneall.py --mirror --bundle --gc -d ~/backup/github  # Bare mirrors for backup
+    uv run gitcloneall.py --resume     # Pick up an interrupted run where it left off
+
+Set GITHUB_TOKEN (or GH_TOKEN) for the 5000 req/h authenticated quota. API pages
+are cached under ~/.cache/gitcloneall and revalidated with ETags, so unchanged
+pages come back as 304s that don't count against the limit.
 """
 
+import asyncio
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shutil
 import subprocess
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Any
+from urllib.parse import parse_qs, urlsplit
 
 import httpx
 import typer
 
-app = typer.Typer(help="Clone all GitHub repos for a user.")
+app = typer.Typer(help="Clone all GitHub repos for a user, org or starred list.")
 
 DEFAULT_USER = "khalido"
 DEFAULT_DIR = Path.home() / "code"
+STATE_FILE = ".gitcloneall.json"  # per target dir: {"repos": {name: {"synced_at": ..., "pushed_at": ..., "head": ...}}}
+JOURNAL_FILE = ".gitcloneall.journal.jsonl"  # per target dir, per run; see Journal
+TMP_DIR = ".gitcloneall-tmp"  # clones land here until they're complete
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "gitcloneall"
+MAX_RETRIES = 3
+MAX_WAIT = 300  # seconds; fail rather than sleep out a whole rate-limit window
+API_CONNECTIONS = 8  # concurrent page requests
+PER_PAGE = 100  # GitHub's maximum
+# All we keep of each repo's API record
+REPO_FIELDS = (
+    "name", "clone_url", "pushed_at", "size", "archived", "fork", "language", "description", "stargazers_count"
+)
+CACHE_VERSION = 2  # bump when REPO_FIELDS changes so cached pages aren't served without the new fields
+STALL_TIME = 120  # seconds a clone or fetch may go without data (server keepalives count) before git gives up
+# Defaults for every git run; set in the environment to override
+GIT_ENV = {"GIT_HTTP_LOW_SPEED_LIMIT": "1", "GIT_HTTP_LOW_SPEED_TIME": str(STALL_TIME)}
+
+
+def github_token() -> str | None:
+    return os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+
+
+def api_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """An async client for the GitHub API, authenticated if a token is set. Pass transport to stub it in tests."""
+    headers = {"Accept": "application/vnd.github+json", "User-Agent": "gitcloneall.py"}
+    if token := github_token():
+        headers["Authorization"] = f"Bearer {token}"
+    limits = httpx.Limits(max_connections=API_CONNECTIONS)
+    return httpx.AsyncClient(headers=headers, transport=transport, limits=limits, timeout=30)
+
+
+def cache_path(url: str) -> Path:
+    # Keyed by token too: an authenticated listing can include repos an anonymous one doesn't
+    key = hashlib.sha256(f"{CACHE_VERSION} {github_token() or ''} {url}".encode()).hexdigest()[:32]
+    return CACHE_DIR / "pages" / f"{key}.json"
+
+
+def retry_delay(response: httpx.Response, attempt: int) -> float | None:
+    """Seconds to wait before retrying a rate-limited or failed response, or None if it shouldn't be retried."""
+    status = response.status_code
+    if status not in (403, 429) and status < 500:
+        return None
+    try:
+        if retry_after := response.headers.get("Retry-After"):
+            return float(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            return max(0.0, int(response.headers.get("X-RateLimit-Reset", 0)) - time.time()) + 1
+    except ValueError:
+        pass
+    if status == 403:  # a plain permission error, not a rate limit
+        return None
+    return 2.0**attempt
+
+
+async def cached_get(
+    client: httpx.AsyncClient, url: str, params: dict | None = None, parse: Callable[[Any], Any] = lambda data: data
+) -> tuple[Any, dict[str, str]]:
+    """GET a JSON API resource through the on-disk cache. Returns (parse(body), {rel: url} from the Link header).
+
+    The stored ETag / Last-Modified are sent back so an unchanged page costs a 304,
+    which GitHub doesn't count against the rate limit. Rate-limited and 5xx responses
+    are retried after Retry-After / X-RateLimit-Reset, or with exponential backoff.
+    """
+    request = client.build_request("GET", url, params=params)
+    path = cache_path(str(request.url))
+    try:
+        entry = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        entry = None
+    if entry and entry.get("etag"):
+        request.headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        request.headers["If-Modified-Since"] = entry["last_modified"]
+
+    for attempt in range(MAX_RETRIES + 1):
+        response = await client.send(request)
+        delay = retry_delay(response, attempt)
+        if delay is None or attempt == MAX_RETRIES or delay > MAX_WAIT:
+            break
+        typer.secho(f"GitHub API returned {response.status_code}, retrying in {delay:.0f}s...", err=True)
+        await asyncio.sleep(delay)
+
+    if response.status_code == 304 and entry:
+        # An unchanged page doesn't mean unchanged pagination: trust the 304's own Link header if it has one
+        if not response.links:
+            return entry["data"], entry.get("links", {})
+        entry["links"] = {rel: link["url"] for rel, link in response.links.items()}
+    else:
+        response.raise_for_status()
+        entry = {
+            "url": str(request.url),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "links": {rel: link["url"] for rel, link in response.links.items()},
+            "data": parse(response.json()),
+        }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry))
+        tmp.replace(path)
+    except OSError:
+        pass
+    return entry["data"], entry["links"]
+
+
+def api_error(e: httpx.HTTPStatusError) -> str:
+    """A one-line explanation of a failed API call, with a hint when it's the rate limit."""
+    response = e.response
+    try:
+        message = response.json().get("message", "")
+    except ValueError:
+        message = ""
+    error = f"GitHub API error {response.status_code}" + (f": {message}" if message else "")
+    if response.headers.get("X-RateLimit-Remaining") == "0" and not github_token():
+        error += " (set GITHUB_TOKEN or GH_TOKEN for a higher rate limit)"
+    return error
+
+
+def slim_repos(page: list[dict]) -> list[dict]:
+    return [{field: repo.get(field) for field in REPO_FIELDS} for repo in page]
+
+
+async def fetch_pages(
+    url: str, params: dict, transport: httpx.AsyncBaseTransport | None = None, ordered: bool = False
+) -> AsyncIterator[list[dict]]:
+    """
+    Yield each page of a paginated listing as it arrives. The first response's
+    Link rel="last" says how many pages there are, so the rest are fetched
+    concurrently (up to API_CONNECTIONS at once) and yielded in completion order.
+    Without a "last" link, or with ordered (so a consumer can stop partway through a
+    sorted listing), rel="next" is followed one page at a time.
+
+    Links cached with a page can be stale (a 304 without a Link header), so if the
+    final page is full, the pages after it are fetched until one isn't.
+    """
+    async with api_client(transport) as client:
+        page, links = await cached_get(client, url, params, slim_repos)
+        yield page
+        # The server may cap per_page; a first page followed by more shows the real size
+        page_size = len(page) if links else params.get("per_page", 30)
+        number = 1
+        if "last" in links and not ordered:
+            number = int(parse_qs(urlsplit(links["last"]).query)["page"][0])
+
+            async def numbered(n: int) -> tuple[int, list[dict]]:
+                return n, (await cached_get(client, url, {**params, "page": n}, slim_repos))[0]
+
+            tasks = [asyncio.create_task(numbered(n)) for n in range(2, number + 1)]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    n, batch = await task
+                    if n == number:
+                        page = batch
+                    yield batch
+            finally:
+                for task in tasks:
+                    task.cancel()
+        else:
+            while "next" in links:
+                page, links = await cached_get(client, links["next"], parse=slim_repos)
+                number += 1
+                yield page
+        while page and len(page) >= page_size:
+            number += 1
+            page, _ = await cached_get(client, url, {**params, "page": number}, slim_repos)
+            if page:
+                yield page
+
 
+def iter_repos(
+    url: str, params: dict, transport: httpx.AsyncBaseTransport | None = None, ordered: bool = False
+) -> Iterator[dict]:
+    """Stream repo records from fetch_pages to synchronous code; stopping early cancels outstanding requests."""
+    with asyncio.Runner() as runner:
+        pages = fetch_pages(url, params, transport, ordered)
+        try:
+            while True:
+                try:
+                    yield from runner.run(anext(pages))
+                except StopAsyncIteration:
+                    break
+        finally:
+            runner.run(pages.aclose())
 
-def get_repos(username: str) -> list[dict]:
-    """Fetch all public repos for a GitHub user."""
-    repos = []
-    page = 1
-    per_page = 100
 
-    with httpx.Client() as client:
-        while True:
-            url = f"https://api.github.com/users/{username}/repos"
-            response = client.get(url, params={"per_page": per_page, "page": page})
-            response.raise_for_status()
-            data = response.json()
+@dataclass
+class RepoFilter:
+    """Which repos to keep. Calling it checks one repo and counts the ones it rejects."""
 
-            if not data:
-                break
+    forks: bool = True
+    archived: bool = True
+    languages: tuple[str, ...] = ()  # lowercase
+    pushed_since: str | None = None  # in GitHub's timestamp format, see utc_now
+    match: str | None = None  # name glob
+    regex: re.Pattern | None = None  # searched in the name
+    rejected: int = 0
 
-            repos.extend(data)
-            if len(data) < per_page:
-                break
-            page += 1
+    def __call__(self, repo: dict) -> bool:
+        keep = (
+            (self.forks or not repo.get("fork"))
+            and (self.archived or not repo.get("archived"))
+            and (not self.languages or (repo.get("language") or "").lower() in self.languages)
+            and (not self.pushed_since or (repo.get("pushed_at") or "") >= self.pushed_since)
+            and (not self.match or fnmatch.fnmatch(repo["name"], self.match))
+            and (not self.regex or bool(self.regex.search(repo["name"])))
+        )
+        self.rejected += not keep
+        return keep
 
-    return repos
 
+@dataclass
+class RepoSource:
+    """Which listing to fetch: a user's repos (the default), an org's, a user's stars, or the token owner's."""
 
-def clone_repo(clone_url: str, target_dir: Path) -> bool:
-    """Clone a repo. Returns True if cloned, False if already exists."""
-    repo_name = clone_url.split("/")[-1].replace(".git", "")
-    repo_path = target_dir / repo_name
+    user: str = DEFAULT_USER
+    org: str | None = None
+    starred: bool = False
+    mine: bool = False
 
+    def __str__(self) -> str:
+        if self.org:
+            return f"org {self.org}"
+        if self.starred:
+            return f"repos starred by {self.user}"
+        return "the authenticated user" if self.mine else self.user
+
+    def request(self, repo_filter: RepoFilter) -> tuple[str, dict, bool]:
+        """
+        The listing's URL and query params, with as much of repo_filter pushed into
+        them as the endpoint supports, and whether results come most recently pushed
+        first (so the listing can stop at pushed_since rather than fetch every page).
+        """
+        params = {"per_page": PER_PAGE}
+        if self.starred:  # only sorts by star date
+            return f"{API_URL}/users/{self.user}/starred", params, False
+        if self.org:
+            url = f"{API_URL}/orgs/{self.org}/repos"
+            if not repo_filter.forks:
+                params["type"] = "sources"
+        elif self.mine:
+            url = f"{API_URL}/user/repos"
+            params["affiliation"] = "owner"
+        else:
+            url = f"{API_URL}/users/{self.user}/repos"
+        newest_first = bool(repo_filter.pushed_since)
+        if newest_first:
+            params |= {"sort": "pushed", "direction": "desc"}
+        return url, params, newest_first
+
+
+def get_repos(
+    source: RepoSource, repo_filter: RepoFilter | None = None, transport: httpx.AsyncBaseTransport | None = None
+) -> Iterator[dict]:
+    """Stream the source's repos that pass repo_filter, as slim records (see REPO_FIELDS)."""
+    repo_filter = repo_filter or RepoFilter()
+    url, params, newest_first = source.request(repo_filter)
+    for repo in iter_repos(url, params, transport, ordered=newest_first):
+        if newest_first and (repo.get("pushed_at") or "") < repo_filter.pushed_since:
+            break  # the rest were pushed even earlier
+        if repo_filter(repo):
+            yield repo
+
+
+LARGE_STRATEGIES = {
+    "blobless": ["--filter=blob:none"],  # full history, file contents fetched on demand
+    "treeless": ["--filter=tree:0"],  # full commit history only
+    "shallow": ["--depth=1"],  # latest commit only
+}
+
+
+@dataclass
+class CloneOptions:
+    """How new clones are made; see clone_args."""
+
+    depth: int | None = None
+    filter: str | None = None
+    single_branch: bool = False
+    reference: Path | None = None
+    dissociate: bool = False
+    large_mb: int = 0  # repos above this (API size) get large_strategy unless depth/filter are set
+    large_strategy: str = "blobless"
+
+
+def clone_args(repo: dict, options: CloneOptions) -> list[str]:
+    """Extra `git clone` arguments for a repo, e.g. ["--filter=blob:none", "--single-branch"]."""
+    args = []
+    if options.depth:
+        args.append(f"--depth={options.depth}")
+    if options.filter:
+        args.append(f"--filter={options.filter}")
+    # GitHub reports size in KB
+    if not args and options.large_mb and repo.get("size", 0) > options.large_mb * 1024:
+        args.extend(LARGE_STRATEGIES[options.large_strategy])
+    if options.single_branch:
+        args.append("--single-branch")
+    if options.reference:
+        args.append(f"--reference-if-able={options.reference}")
+        if options.dissociate:
+            args.append("--dissociate")
+    return args
+
+
+def clone_repo(clone_url: str, repo_path: Path, quiet: bool = False, extra_args: list[str] = ()) -> bool:
+    """Clone a repo into repo_path. Returns True if cloned, False if already exists.
+
+    Raises CalledProcessError if git fails; with quiet, git's output is captured
+    (stderr ends up on the exception) so parallel clones don't interleave.
+    """
     if repo_path.exists():
         return False
 
-    subprocess.run(["git", "clone", clone_url], cwd=target_dir, check=True)
+    clone_atomically([*extra_args, clone_url], repo_path, quiet)
     return True
 
 
+def clone_atomically(args: list[str], dest: Path, quiet: bool = False) -> None:
+    """
+    `git clone <args>` into a scratch dir under target_dir/TMP_DIR, renamed to dest
+    only once git succeeds, so an interrupted or failed clone never leaves a
+    half-populated dest that a later run would take for a finished one.
+    """
+    tmp = dest.parent / TMP_DIR / dest.name
+    shutil.rmtree(tmp, ignore_errors=True)  # left over from an interrupted run
+    tmp.parent.mkdir(exist_ok=True)
+    try:
+        subprocess.run(
+            ["git", "clone", *args, str(tmp)], check=True, capture_output=quiet, text=True, env={**GIT_ENV, **os.environ}
+        )
+        tmp.rename(dest)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_state(target_dir: Path) -> dict:
+    """Per-repo bookkeeping kept in the target dir, e.g. {"repos": {"dotfiles": {"synced_at": "2025-01-01T00:00:00Z"}}}."""
+    try:
+        state = json.loads((target_dir / STATE_FILE).read_text())
+    except (OSError, json.JSONDecodeError):
+        state = {}
+    state.setdefault("repos", {})
+    return state
+
+
+def save_state(target_dir: Path, state: dict) -> None:
+    tmp = target_dir / f"{STATE_FILE}.tmp"
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True) + "\n")
+    tmp.replace(target_dir / STATE_FILE)
+
+
+class Journal:
+    """
+    Append-only JSON lines log of a run in target_dir/JOURNAL_FILE, one line per
+    state change: {"name": ..., "state": "pending" | "cloning" | "done" | "failed",
+    "at": ..., "error": ..., "duration": ...}. A repo's last line is its state, so
+    an interrupted run leaves behind exactly what's left to do.
+    """
+
+    def __init__(self, target_dir: Path, resume: bool = False):
+        self.path = target_dir / JOURNAL_FILE
+        self.states: dict[str, str] = {}
+        self.lock = threading.Lock()
+        if not resume:
+            self.path.write_text("")
+            return
+        try:
+            lines = self.path.read_text().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by the interruption
+            self.states[entry["name"]] = entry["state"]
+
+    def record(self, name: str, state: str, **fields) -> None:
+        line = json.dumps({"name": name, "state": state, "at": utc_now(), **fields})
+        with self.lock:
+            self.states[name] = state
+            with self.path.open("a") as f:
+                f.write(line + "\n")
+
+
+def utc_now() -> str:
+    """Current time in GitHub's timestamp format, so it compares as a string with pushed_at."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def git(repo_path: Path, *args: str) -> str:
+    """Run a git command in repo_path and return stripped stdout. Raises CalledProcessError."""
+    return subprocess.run(
+        ["git", *args], cwd=repo_path, check=True, capture_output=True, text=True, env={**GIT_ENV, **os.environ}
+    ).stdout.strip()
+
+
+@dataclass
+class Outcome:
+    name: str
+    status: str  # "cloned", "exists", "failed", or a sync status (see sync_repo)
+    error: str = ""
+    detail: str = ""
+    synced_at: str | None = None  # set when a fetch succeeded
+    pushed_at: str | None = None  # mirrors: the API pushed_at the mirror is now current with
+    head: str | None = None  # mirrors: HEAD SHA after the fetch
+
+
+def sync_repo(repo: dict, repo_path: Path, last_synced: str | None) -> Outcome:
+    """
+    Fetch an existing clone and fast-forward it if that's safe.
+    Status is "updated" (fast-forwarded), "current", "ahead", "diverged", "dirty"
+    (has local changes, left alone) or "no-upstream"; "unchanged" is "current"
+    without a fetch, as nothing was pushed since the last sync. The local checks
+    (and a fast-forward to what was fetched before) run either way, so a dirty or
+    diverged clone is reported every run. detail describes ahead/behind/dirty.
+    """
+    name = repo["name"]
+    pushed_at = repo.get("pushed_at")
+    fetch = not (last_synced and pushed_at and pushed_at <= last_synced)
+
+    started = utc_now() if fetch else None
+    if fetch:
+        git(repo_path, "fetch", "--prune", "--quiet")
+    try:
+        git(repo_path, "rev-parse", "--abbrev-ref", "@{upstream}")
+    except subprocess.CalledProcessError:
+        return Outcome(name, "no-upstream", synced_at=started)
+
+    ahead, behind = (int(n) for n in git(repo_path, "rev-list", "--left-right", "--count", "HEAD...@{upstream}").split())
+    changed = len(git(repo_path, "status", "--porcelain").splitlines())
+    parts = []
+    if ahead:
+        parts.append(f"ahead {ahead}")
+    if behind:
+        parts.append(f"behind {behind}")
+    if changed:
+        parts.append(f"{changed} changed file(s)")
+    detail = ", ".join(parts)
+
+    if changed:
+        status = "dirty"
+    elif ahead and behind:
+        status = "diverged"
+    elif behind:
+        git(repo_path, "merge", "--ff-only", "--quiet", "@{upstream}")
+        status, detail = "updated", f"{behind} new commit(s)"
+    elif ahead:
+        status = "ahead"
+    else:
+        status = "current" if fetch else "unchanged"
+    return Outcome(name, status, detail=detail, synced_at=started)
+
+
+def git_error(e: subprocess.CalledProcessError) -> str:
+    """The most useful line of a failed git command's stderr."""
+    lines = (e.stderr or "").strip().splitlines()
+    if not lines:
+        return f"git exited {e.returncode}"
+    return next((line for line in lines if line.startswith(("fatal:", "error:"))), lines[-1])
+
+
+@dataclass
+class MirrorOptions:
+    bundle: bool = False  # keep <name>.bundle next to each mirror, rewritten when it changes
+    gc: bool = False  # git gc --auto after fetching
+
+
+def head_sha(repo_path: Path) -> str | None:
+    try:
+        return git(repo_path, "rev-parse", "--verify", "--quiet", "HEAD")
+    except subprocess.CalledProcessError:
+        return None  # empty repo
+
+
+def mirror_repo(repo: dict, target_dir: Path, last: dict, options: MirrorOptions) -> Outcome:
+    """
+    Keep a bare `git clone --mirror` of a repo in target_dir/<name>.git.
+    Status is "mirrored" (new), "updated" (fetched with `git remote update --prune`)
+    or "unchanged" (pushed_at matches the manifest, so nothing was fetched).
+    """
+    name = repo["name"]
+    path = target_dir / f"{name}.git"
+    bundle = target_dir / f"{name}.bundle" if options.bundle else None
+    pushed_at = repo.get("pushed_at")
+    if path.exists():
+        if pushed_at and pushed_at <= last.get("pushed_at", "") and not (bundle and not bundle.exists()):
+            return Outcome(name, "unchanged")
+        started, before = utc_now(), head_sha(path)
+        git(path, "remote", "update", "--prune")
+        status = "updated"
+    else:
+        started, before = utc_now(), None
+        clone_atomically(["--mirror", "--quiet", repo["clone_url"]], path, quiet=True)
+        status = "mirrored"
+
+    head = head_sha(path)
+    if options.gc:
+        git(path, "gc", "--auto", "--quiet")
+    if bundle and head:  # git refuses to bundle an empty repo
+        tmp = bundle.with_suffix(".bundle.tmp")
+        git(path, "bundle", "create", "--quiet", str(tmp), "--all")
+        tmp.replace(bundle)
+    detail = f"HEAD {before[:7]}..{head[:7]}" if before and head and before != head else ""
+    return Outcome(name, status, detail=detail, synced_at=started, pushed_at=pushed_at, head=head)
+
+
+def process_repo(
+    repo: dict,
+    target_dir: Path,
+    quiet: bool,
+    last: dict | None = None,
+    sync: bool = False,
+    options: CloneOptions = CloneOptions(),
+    mirror: MirrorOptions | None = None,
+) -> Outcome:
+    """Clone, mirror or (with sync) update one repo, turning a git failure into a failed Outcome instead of raising.
+
+    last is the repo's entry from the state file.
+    """
+    name = repo["name"]
+    last = last or {}
+    try:
+        if mirror:
+            return mirror_repo(repo, target_dir, last, mirror)
+        if sync and (target_dir / name / ".git").exists():
+            return sync_repo(repo, target_dir / name, last.get("synced_at"))
+        started = utc_now()
+        cloned = clone_repo(repo["clone_url"], target_dir / name, quiet=quiet, extra_args=clone_args(repo, options))
+    except subprocess.CalledProcessError as e:
+        return Outcome(name, "failed", git_error(e))
+    except OSError as e:
+        return Outcome(name, "failed", str(e))
+    # A fresh clone has everything pushed before it started
+    return Outcome(name, "cloned", synced_at=started) if cloned else Outcome(name, "exists")
+
+
+def in_flight_bytes(scratch_dir: Path) -> int:
+    """
+    Bytes received so far by the clones under scratch_dir: the size of each one's
+    objects/pack dir, where git writes the incoming pack. A few stats per clone,
+    instead of walking their checkouts.
+    """
+    total = 0
+    try:
+        clones = [entry.path for entry in os.scandir(scratch_dir) if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return 0
+    for clone in clones:
+        for pack_dir in (Path(clone, ".git", "objects", "pack"), Path(clone, "objects", "pack")):  # checkout, mirror
+            try:
+                total += sum(entry.stat(follow_symlinks=False).st_size for entry in os.scandir(pack_dir))
+            except OSError:
+                pass
+    return total
+
+
+class Scheduler:
+    """
+    How many repos to work on at once. A fixed jobs count never changes; with
+    jobs=0 it adapts. It starts at 2 and doubles while throughput keeps improving,
+    then climbs or drops by one to follow it. It halves after failures (including
+    transfers that stalled, see GIT_ENV) or when the load average is high.
+
+    Throughput is bytes per second. Clones in progress are measured by how much
+    pack data their scratch dirs under TMP_DIR have received. Finished clones and
+    mirrors count their API size; anything else (updates, no-ops, failures) counts
+    1 KB, so a run of quick updates still registers without looking like a big clone.
+    """
+
+    START = 2
+    MAX = 32
+    INTERVAL = 2.0  # seconds between adjustments
+    MAX_LOAD = 1.5  # load average per CPU above which to back off
+
+    def __init__(self, jobs: int, scratch_dir: Path):
+        self.adaptive = jobs <= 0
+        self.limit = self.START if self.adaptive else jobs
+        self.scratch_dir = scratch_dir
+        self.slow_start = True
+        self.best_rate = 0.0
+        self.finished_bytes = 0
+        self.errors = 0
+        self.last_bytes = 0
+        self.last_tick = time.monotonic()
+
+    @property
+    def max_workers(self) -> int:
+        return self.MAX if self.adaptive else max(1, self.limit)
+
+    def finished(self, repo: dict, outcome: Outcome) -> None:
+        transferred = outcome.status in ("cloned", "mirrored")
+        self.finished_bytes += max(1, repo.get("size") or 0) * 1024 if transferred else 1024
+        self.errors += outcome.status == "failed"
+
+    def overloaded(self) -> bool:
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1) > self.MAX_LOAD
+        except (AttributeError, OSError):  # no load average on this platform
+            return False
+
+    def tick(self) -> None:
+        """Re-measure throughput and adjust limit, at most once per INTERVAL."""
+        now = time.monotonic()
+        if not self.adaptive or now - self.last_tick < self.INTERVAL:
+            return
+        progress = self.finished_bytes + in_flight_bytes(self.scratch_dir)
+        rate = (progress - self.last_bytes) / (now - self.last_tick)
+        # In-flight bytes move into finished_bytes (as API size) when a clone completes; close enough
+        self.last_bytes, self.last_tick = progress, now
+
+        if self.errors or self.overloaded():
+            self.limit = max(1, self.limit // 2)
+            self.slow_start = False
+            self.best_rate = rate
+        elif rate > self.best_rate * 1.1:
+            self.limit = min(self.MAX, self.limit * 2 if self.slow_start else self.limit + 1)
+            self.best_rate = rate
+        elif rate < self.best_rate * 0.9:
+            self.slow_start = False
+            self.limit = max(1, self.limit - 1)
+            self.best_rate = rate
+        elif self.best_rate:  # no data yet (the server is still packing) isn't a plateau
+            self.slow_start = False
+        self.errors = 0
+
+
+def process_repos(
+    repos: list[dict],
+    target_dir: Path,
+    jobs: int = 0,
+    sync: bool = False,
+    state: dict | None = None,
+    options: CloneOptions = CloneOptions(),
+    mirror: MirrorOptions | None = None,
+    journal: Journal | None = None,
+):
+    """
+    Clone, mirror or update repos, `jobs` at a time (0 adapts, see Scheduler).
+    Biggest repos go first so one huge clone doesn't start last and hold up the end
+    of the run. Yields an Outcome as each finishes.
+    """
+    quiet = jobs != 1 or sync
+    known = (state or {}).get("repos", {})
+
+    def run(repo: dict) -> Outcome:
+        if journal:
+            journal.record(repo["name"], "cloning")
+        started = time.monotonic()
+        outcome = process_repo(repo, target_dir, quiet, known.get(repo["name"]), sync, options, mirror)
+        if journal:
+            duration = round(time.monotonic() - started, 3)
+            if outcome.status == "failed":
+                journal.record(outcome.name, "failed", error=outcome.error, duration=duration)
+            else:
+                journal.record(outcome.name, "done", duration=duration)
+        return outcome
+
+    scheduler = Scheduler(jobs, target_dir / TMP_DIR)
+    queue = deque(sorted(repos, key=lambda repo: repo.get("size") or 0, reverse=True))
+    running = {}
+    with ThreadPoolExecutor(max_workers=scheduler.max_workers) as pool:
+        while queue or running:
+            while queue and len(running) < scheduler.limit:
+                repo = queue.popleft()
+                running[pool.submit(run, repo)] = repo
+            done, _ = wait(running, timeout=scheduler.INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                scheduler.finished(running.pop(future), outcome)
+                yield outcome
+            scheduler.tick()
+
+
 @app.command()
 def main(
     user: Annotated[str, typer.Option("--user", "-u", help="GitHub username")] = DEFAULT_USER,
+    org: Annotated[str | None, typer.Option("--org", "-o", help="Clone an organization's repos")] = None,
+    starred: Annotated[bool, typer.Option("--starred", help="Clone the repos --user has starred")] = False,
+    mine: Annotated[
+        bool, typer.Option("--mine", help="Clone repos the token's user owns, including private ones")
+    ] = False,
+    no_forks: Annotated[bool, typer.Option("--no-forks", help="Skip forks")] = False,
+    no_archived: Annotated[bool, typer.Option("--no-archived", help="Skip archived repos")] = False,
+    languages: Annotated[
+        list[str] | None, typer.Option("--language", help="Only repos in this language (repeatable)")
+    ] = None,
+    pushed_since: Annotated[
+        datetime | None,
+        typer.Option("--pushed-since", formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S"], help="Only repos pushed since"),
+    ] = None,
+    match: Annotated[str | None, typer.Option("--match", help="Only repos whose name matches this glob")] = None,
+    regex: Annotated[str | None, typer.Option("--regex", help="Only repos whose name matches this regex")] = None,
     directory: Annotated[Path, typer.Option("--dir", "-d", help="Target directory")] = DEFAULT_DIR,
     list_only: Annotated[bool, typer.Option("--list", "-l", help="List repos only")] = False,
+    jobs: Annotated[
+        int, typer.Option("--jobs", "-j", help="Repos to clone in parallel (0 = adapt to throughput and load)")
+    ] = 0,
+    sync: Annotated[bool, typer.Option("--sync", "-s", help="Fetch and fast-forward existing clones")] = False,
+    depth: Annotated[int | None, typer.Option("--depth", help="Shallow clone with this many commits")] = None,
+    clone_filter: Annotated[
+        str | None, typer.Option("--filter", help="Partial clone filter, e.g. blob:none or tree:0")
+    ] = None,
+    single_branch: Annotated[bool, typer.Option("--single-branch", help="Clone only the default branch")] = False,
+    reference: Annotated[
+        Path | None, typer.Option("--reference", help="Borrow objects from this repo / shared object store")
+    ] = None,
+    dissociate: Annotated[
+        bool, typer.Option("--dissociate", help="Copy borrowed objects so clones don't depend on --reference")
+    ] = False,
+    large_mb: Annotated[
+        int, typer.Option("--large-mb", help="Repos bigger than this (MB, per the API) use --large-strategy")
+    ] = 0,
+    large_strategy: Annotated[
+        str, typer.Option("--large-strategy", help="blobless, treeless or shallow")
+    ] = "blobless",
+    mirror: Annotated[
+        bool, typer.Option("--mirror", "-m", help="Keep bare mirrors (<name>.git) and update them each run")
+    ] = False,
+    bundle: Annotated[bool, typer.Option("--bundle", help="With --mirror, also write <name>.bundle")] = False,
+    gc: Annotated[bool, typer.Option("--gc", help="With --mirror, run git gc --auto after fetching")] = False,
+    resume: Annotated[
+        bool, typer.Option("--resume", "-r", help="Only process repos the last run didn't finish")
+    ] = False,
 ):
-    """Clone all public repos for a GitHub user."""
-    typer.echo(f"Fetching repos for {user}...")
-    repos = get_repos(user)
+    """Clone all public repos for a GitHub user, org or starred list."""
+    if sum((bool(org), starred, mine)) > 1:
+        typer.secho("Use only one of --org, --starred and --mine", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    if mine and not github_token():
+        typer.secho("--mine needs GITHUB_TOKEN or GH_TOKEN", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    try:
+        pattern = re.compile(regex) if regex else None
+    except re.error as e:
+        typer.secho(f"Bad --regex: {e}", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    source = RepoSource(user, org, starred, mine)
+    repo_filter = RepoFilter(
+        forks=not no_forks,
+        archived=not no_archived,
+        languages=tuple(language.lower() for language in languages or ()),
+        pushed_since=pushed_since.strftime("%Y-%m-%dT%H:%M:%SZ") if pushed_since else None,
+        match=match,
+        regex=pattern,
+    )
+
+    typer.echo(f"Fetching repos for {source}...")
+    try:
+        repos = list(get_repos(source, repo_filter))
+    except httpx.HTTPStatusError as e:
+        typer.secho(api_error(e), fg=typer.colors.RED)
+        raise typer.Exit(1)
+    except httpx.HTTPError as e:
+        typer.secho(f"Couldn't reach the GitHub API: {e}", fg=typer.colors.RED)
+        raise typer.Exit(1)
 
     if not repos:
         typer.echo("No repos found.")
         raise typer.Exit(1)
 
-    typer.echo(f"Found {len(repos)} repos\n")
+    filtered = f" ({repo_filter.rejected} filtered out)" if repo_filter.rejected else ""
+    typer.echo(f"Found {len(repos)} repos{filtered}\n")
 
     if list_only:
         for repo in sorted(repos, key=lambda r: r["name"].lower()):
-            stars = repo.get("stargazers_count", 0)
-            desc = repo.get("description", "") or ""
+            stars = repo.get("stargazers_count") or 0
+            desc = repo.get("description") or ""
             desc = desc[:50] + "..." if len(desc) > 50 else desc
             typer.echo(f"  {repo['name']:<30} {stars:>3} stars  {desc}")
         return
 
+    if large_strategy not in LARGE_STRATEGIES:
+        choices = ", ".join(LARGE_STRATEGIES)
+        typer.secho(f"Unknown --large-strategy {large_strategy!r}, use one of: {choices}", fg=typer.colors.RED)
+        raise typer.Exit(2)
+    options = CloneOptions(depth, clone_filter, single_branch, reference, dissociate, large_mb, large_strategy)
+    mirror_options = MirrorOptions(bundle, gc) if mirror else None
+
     directory.mkdir(parents=True, exist_ok=True)
+    journal = Journal(directory, resume)
+    if resume and journal.states:
+        total = len(repos)
+        repos = [repo for repo in repos if journal.states.get(repo["name"]) != "done"]
+        typer.echo(f"Resuming: {len(repos)} of {total} repos left to do\n")
+    for repo in repos:
+        if repo["name"] not in journal.states:
+            journal.record(repo["name"], "pending")
 
     cloned = 0
     skipped = 0
+    updated = 0
+    attention = []
+    failed = []
+    width = len(str(len(repos)))
+    state = load_state(directory)
 
-    for repo in repos:
-        name = repo["name"]
-        clone_url = repo["clone_url"]
-
-        if clone_repo(clone_url, directory):
-            typer.secho(f"  Cloned: {name}", fg=typer.colors.GREEN)
-            cloned += 1
-        else:
-            typer.echo(f"  Exists: {name}")
-            skipped += 1
+    try:
+        outcomes = process_repos(repos, directory, jobs, sync, state, options, mirror_options, journal)
+        for done, outcome in enumerate(outcomes, start=1):
+            progress = f"[{done:>{width}}/{len(repos)}]"
+            detail = f" ({outcome.detail})" if outcome.detail else ""
+            if outcome.synced_at:
+                entry = state["repos"].setdefault(outcome.name, {})
+                entry["synced_at"] = outcome.synced_at
+                if outcome.pushed_at:
+                    entry["pushed_at"] = outcome.pushed_at
+                if outcome.head:
+                    entry["head"] = outcome.head
+            if outcome.status in ("cloned", "mirrored"):
+                typer.secho(f"  {progress} {outcome.status.capitalize()}: {outcome.name}", fg=typer.colors.GREEN)
+                cloned += 1
+            elif outcome.status == "updated":
+                typer.secho(f"  {progress} Updated: {outcome.name}{detail}", fg=typer.colors.GREEN)
+                updated += 1
+            elif outcome.status in ("exists", "unchanged", "current"):
+                label = {"exists": "Exists", "unchanged": "Unchanged", "current": "Up to date"}[outcome.status]
+                typer.echo(f"  {progress} {label}: {outcome.name}")
+                skipped += 1
+            elif outcome.status == "failed":
+                typer.secho(f"  {progress} Failed: {outcome.name} ({outcome.error})", fg=typer.colors.RED)
+                failed.append(outcome)
+            else:
+                label = outcome.status.replace("-", " ").capitalize()
+                typer.secho(f"  {progress} {label}: {outcome.name}{detail}", fg=typer.colors.YELLOW)
+                attention.append(outcome)
+    finally:
+        save_state(directory, state)
+        try:
+            (directory / TMP_DIR).rmdir()
+        except OSError:
+            pass  # missing, or holding an interrupted clone
 
-    typer.echo(f"\nDone! Cloned {cloned}, skipped {skipped} (already exist)")
+    if mirror:
+        typer.echo(
+            f"\nDone! Mirrored {cloned}, updated {updated}, skipped {skipped} (unchanged), failed {len(failed)}"
+        )
+    elif sync:
+        typer.echo(
+            f"\nDone! Cloned {cloned}, updated {updated}, skipped {skipped} (up to date), "
+            f"needs attention {len(attention)}, failed {len(failed)}"
+        )
+    else:
+        typer.echo(f"\nDone! Cloned {cloned}, skipped {skipped} (already exist), failed {len(failed)}")
+    if failed:
+        typer.secho(f"Failed: {', '.join(o.name for o in failed)}", fg=typer.colors.RED)
+        raise typer.Exit(1)
 
 
 if __name__ == "__main__":
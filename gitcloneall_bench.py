@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.14"
+# dependencies = ["httpx", "typer"]
+# ///
+"""
+Benchmark gitcloneall.py offline, against a local fake GitHub API and local bare repos.
+
+The fake API serves /users/<name>/repos (and /orgs/<name>/repos) with GitHub's
+pagination, Link headers, ETags and rate-limit headers, plus added latency.
+Repos are generated as bare repos cloned over file:// with partial clone enabled.
+
+Usage:
+    uv run gitcloneall_bench.py                            # Defaults: 500 listed, 20 cloned
+    uv run gitcloneall_bench.py --repos 2000 --latency 0.2 # Big account, slow API
+    uv run gitcloneall_bench.py --rate-limit 10            # Exercise rate-limit backoff
+    uv run gitcloneall_bench.py --file-kb 1024 --jobs 16   # Bigger repos, more workers
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Annotated
+from urllib.parse import parse_qs, urlsplit
+
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import gitcloneall  # noqa: E402
+
+app = typer.Typer(help="Benchmark gitcloneall.py against a local fake GitHub.")
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    """Just enough of the GitHub repos API for get_repos: pages, Link, ETag and rate-limit headers."""
+
+    daemon_threads = True
+
+    def __init__(self, repos: list[dict], max_per_page: int, latency: float, rate_limit: int):
+        super().__init__(("127.0.0.1", 0), FakeGitHubHandler)
+        self.repos = repos
+        self.max_per_page = max_per_page
+        self.latency = latency
+        self.rate_limit = rate_limit  # requests per one-second window, 0 for unlimited
+        self.remaining = rate_limit
+        self.window_reset = time.time() + 1
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def take_request(self) -> int | None:
+        """Count a request against the rate limit; returns requests left, or None if over the limit."""
+        with self.lock:
+            self.requests += 1
+            if not self.rate_limit:
+                return 5000
+            if time.time() >= self.window_reset:
+                self.remaining, self.window_reset = self.rate_limit, time.time() + 1
+            if self.remaining == 0:
+                return None
+            self.remaining -= 1
+            return self.remaining
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    server: FakeGitHub
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if not re.fullmatch(r"/(users|orgs)/[^/]+/repos", url.path):
+            return self.reply(404, {"message": "Not Found"})
+        time.sleep(self.server.latency)
+
+        remaining = self.server.take_request()
+        if remaining is None:
+            headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(self.server.window_reset))}
+            return self.reply(403, {"message": "API rate limit exceeded"}, headers)
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        per_page = min(int(params.get("per_page", 30)), self.server.max_per_page)
+        page = int(params.get("page", 1))
+        repos = self.server.repos
+        last = max(1, -(-len(repos) // per_page))
+        body = repos[(page - 1) * per_page : page * per_page]
+
+        links = []
+        base = f"{self.server.url}{url.path}?" + "&".join(f"{k}={v}" for k, v in params.items() if k != "page")
+        if page < last:
+            links += [f'<{base}&page={page + 1}>; rel="next"', f'<{base}&page={last}>; rel="last"']
+        if page > 1:
+            links += [f'<{base}&page=1>; rel="first"', f'<{base}&page={page - 1}>; rel="prev"']
+        payload = json.dumps(body).encode()
+        etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+        headers = {"ETag": etag, "Link": ", ".join(links), "X-RateLimit-Remaining": str(remaining)}
+        if self.headers.get("If-None-Match") == etag:
+            return self.reply(304, None, headers)
+        self.reply(200, payload, headers)
+
+    def reply(self, status: int, body, headers: dict | None = None):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            if value:
+                self.send_header(key, value)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def git(*args: str, cwd: Path | None = None) -> None:
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, env={**os.environ, **GIT_ENV})
+
+
+def make_bare_repos(root: Path, count: int, files: int, file_kb: int, commits: int) -> list[Path]:
+    """
+    Build one template repo of `commits` commits, each rewriting `files` files of
+    random data, then copy it into `count` bare repos that allow partial clones.
+    """
+    template = root / "template"
+    template.mkdir(parents=True)
+    git("init", "--quiet", "--initial-branch=main", cwd=template)
+    for commit in range(commits):
+        for n in range(files):
+            (template / f"file{n}.bin").write_bytes(os.urandom(file_kb * 1024))
+        git("add", "--all", cwd=template)
+        git("commit", "--quiet", "-m", f"commit {commit}", cwd=template)
+
+    repos = []
+    for n in range(count):
+        bare = root / "bare" / f"repo{n:04}.git"
+        git("clone", "--quiet", "--bare", "--no-hardlinks", str(template), str(bare))
+        git("config", "uploadpack.allowFilter", "true", cwd=bare)
+        repos.append(bare)
+    return repos
+
+
+def dir_kb(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) // 1024
+
+
+def listing(count: int, bare: list[Path]) -> list[dict]:
+    """API records for `count` repos; the first len(bare) point at real repos, the rest are listing filler."""
+    repos = []
+    for n in range(count):
+        path = bare[n] if n < len(bare) else None
+        repos.append({
+            "name": f"repo{n:04}",
+            "clone_url": path.as_uri() if path else f"file:///nonexistent/repo{n:04}.git",
+            "pushed_at": f"2025-01-01T00:00:{n % 60:02}Z",
+            "size": dir_kb(path) if path else 0,
+            "archived": False,
+            "fork": False,
+            "language": "Python",
+            "description": f"Benchmark repo {n}",
+            "stargazers_count": 0,
+        })
+    return repos
+
+
+@contextmanager
+def quiet_stderr():
+    """Silence git's progress output; serial clones (jobs=1) let it through to the terminal."""
+    saved = os.dup(2)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 2)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 2)
+        os.close(saved)
+
+
+def timeit(label: str, fn: Callable[[], str], results: list[tuple[str, float, str]]) -> None:
+    started = time.perf_counter()
+    note = fn()
+    elapsed = time.perf_counter() - started
+    results.append((label, elapsed, note))
+    typer.echo(f"  {label:<38} {elapsed:>8.2f}s  {note}")
+
+
+@app.command()
+def main(
+    repos: Annotated[int, typer.Option("--repos", help="Repos in the fake API listing")] = 500,
+    per_page: Annotated[int, typer.Option("--per-page", help="Max page size the fake API allows")] = 100,
+    latency: Annotated[float, typer.Option("--latency", help="Seconds added to each API response")] = 0.05,
+    rate_limit: Annotated[int, typer.Option("--rate-limit", help="API requests per second, 0 for none")] = 0,
+    clone_repos: Annotated[int, typer.Option("--clone-repos", help="How many repos to actually clone")] = 20,
+    files: Annotated[int, typer.Option("--files", help="Files per generated repo")] = 20,
+    file_kb: Annotated[int, typer.Option("--file-kb", help="Size of each file (KB)")] = 64,
+    commits: Annotated[int, typer.Option("--commits", help="Commits per generated repo")] = 5,
+    jobs: Annotated[int, typer.Option("--jobs", "-j", help="Workers for the concurrent runs")] = 8,
+    json_out: Annotated[bool, typer.Option("--json", help="Also print results as JSON")] = False,
+    keep: Annotated[bool, typer.Option("--keep", help="Keep the temp dir")] = False,
+):
+    """Time repo listing (serial vs concurrent, cold vs cached) and cloning (serial vs concurrent, full vs partial)."""
+    root = Path(tempfile.mkdtemp(prefix="gitcloneall-bench-"))
+    clone_repos = min(clone_repos, repos)
+    results: list[tuple[str, float, str]] = []
+    try:
+        typer.echo(f"Generating {clone_repos} repos ({commits} commits x {files} files x {file_kb} KB) in {root}...")
+        bare = make_bare_repos(root, clone_repos, files, file_kb, commits)
+        server = FakeGitHub(listing(repos, bare), per_page, latency, rate_limit)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        gitcloneall.API_URL = server.url
+        gitcloneall.CACHE_DIR = root / "cache"
+        source = gitcloneall.RepoSource(user="bench")
+        url, params, _ = source.request(gitcloneall.RepoFilter())
+
+        def list_repos(ordered: bool, cold: bool = True) -> Callable[[], str]:
+            def run() -> str:
+                if cold:
+                    shutil.rmtree(gitcloneall.CACHE_DIR, ignore_errors=True)
+                before = server.requests
+                count = sum(1 for _ in gitcloneall.iter_repos(url, params, ordered=ordered))
+                return f"{count} repos, {server.requests - before} requests"
+
+            return run
+
+        def clone(workers: int, clone_filter: str | None) -> Callable[[], str]:
+            def run() -> str:
+                target = root / "clones"
+                shutil.rmtree(target, ignore_errors=True)
+                target.mkdir()
+                options = gitcloneall.CloneOptions(filter=clone_filter)
+                with quiet_stderr():
+                    outcomes = list(
+                        gitcloneall.process_repos(server.repos[:clone_repos], target, workers, options=options)
+                    )
+                failed = sum(o.status == "failed" for o in outcomes)
+                return f"{len(outcomes) - failed} cloned, {failed} failed, {dir_kb(target) / 1024:.1f} MB on disk"
+
+            return run
+
+        typer.echo(f"\nListing {repos} repos, {latency * 1000:.0f} ms latency:")
+        timeit("serial (follow rel=next)", list_repos(ordered=True), results)
+        timeit("concurrent (from rel=last)", list_repos(ordered=False), results)
+        timeit("concurrent, cached (304s)", list_repos(ordered=False, cold=False), results)
+
+        typer.echo(f"\nCloning {clone_repos} repos over file://:")
+        timeit("serial, full", clone(1, None), results)
+        timeit(f"concurrent ({jobs} jobs), full", clone(jobs, None), results)
+        timeit("serial, blobless", clone(1, "blob:none"), results)
+        timeit(f"concurrent ({jobs} jobs), blobless", clone(jobs, "blob:none"), results)
+        timeit("adaptive (--jobs 0), full", clone(0, None), results)
+        server.shutdown()
+    finally:
+        if keep:
+            typer.echo(f"\nKept {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if json_out:
+        typer.echo(json.dumps([{"benchmark": label, "seconds": round(s, 4), "note": note} for label, s, note in results]))
+
+
+if __name__ == "__main__":
+    app()